@@ -0,0 +1,68 @@
+# Configurazione gunicorn per la produzione: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _cpu_count() -> int:
+    """CPU realmente disponibili al processo (affinity/cgroup), non quelle dell'host"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Worker async: 2 per CPU (minimo 2, così un handler lento non ferma tutto), override con WEB_CONCURRENCY
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or max(2, min(_cpu_count() * 2, int(os.getenv("MAX_WORKERS", "8"))))
+
+# Riciclo dei worker dopo N richieste (jitter per non riavviarli tutti insieme) per limitare la crescita di memoria
+max_requests = int(os.getenv("MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "200"))
+
+# Keep-alive più lungo dell'idle timeout del proxy Fly.io, backlog ampio per i picchi
+keepalive = int(os.getenv("KEEPALIVE", "75"))
+backlog = int(os.getenv("BACKLOG", "2048"))
+
+# Reload graceful: `kill -HUP <master>` avvia nuovi worker e chiude i vecchi entro graceful_timeout
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+reload = os.getenv("GUNICORN_RELOAD", "0") == "1"
+
+# PRELOAD_APP=1 (cold start): l'app è importata una volta nel master e i worker nascono già pronti.
+# Pool HTTP, sessioni MCP e cache health restano per-worker: il lifespan gira in ogni worker e post_fork
+# azzera lo stato ereditato.
+# Con preload un `kill -HUP` riavvia i worker dal codice già importato dal master: il codice nuovo
+# richiede un riavvio completo. Per questo reload e preload si escludono: GUNICORN_RELOAD=1 vince
+preload_app = os.getenv("PRELOAD_APP", "0") == "1" and not reload
+forwarded_allow_ips = "*"
+
+# Metriche aggregate: ogni worker scrive il suo snapshot in METRICS_DIR e /metrics somma tutti i worker
+# (senza, ogni scrape vedrebbe i contatori di un worker a caso e Prometheus leggerebbe dei reset)
+metrics_dir = os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"app-metrics-{os.getpid()}"))
+loglevel = os.getenv("LOG_LEVEL", "info")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Con preload_app attivo, azzera lo stato ereditato dal master (socket e sessioni non condivisibili)"""
+    module = sys.modules.get("modules.mcp_client.mcp_client")
+    if module is not None:
+        module.mcp_client.transport._client = None
+        module.mcp_client.sessions.clear()
+
+
+def on_starting(server):
+    """Directory delle metriche vuota a ogni avvio del master"""
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Worker terminato (riciclo, reload, crash): i suoi contatori passano nell'archivio delle metriche"""
+    from modules.monitoring.metrics import archive_worker
+    archive_worker(metrics_dir, worker.pid)
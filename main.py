@@ -1,16 +1,86 @@
-from fastapi import FastAPI
+# Primo import: misura i tempi di avvio a partire da qui
+from modules.monitoring.startup import startup_report, FirstRequestTimer
+from modules.monitoring.metrics import metrics, MetricsMiddleware, MetricsFlusher, LoopLagMonitor
+from modules.monitoring.watchdog import watchdog, WatchdogMiddleware
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
+
+from modules.responses import FastJSONResponse, FastJSONRoute, StaticPayload
+from modules.compression import CompressionMiddleware
 
 # Import routes organizzate
-from modules.routes import system_info, mcp, claude
+from modules.routes import system_info, mcp, claude, debug
+from modules.routes.registry import route_registry
 from modules.test import esegui_test_completo
+from modules.mcp_client.mcp_client import mcp_client, health_prober, notification_listener
+
+startup_report.mark("imports")
+
+loop_lag_monitor = LoopLagMonitor()
+metrics_flusher = MetricsFlusher()
+
+async def _prewarm_mcp():
+    """Connessione e sessione MCP pronte prima della prima richiesta"""
+    try:
+        result = await asyncio.wait_for(mcp_client.prewarm(), timeout=10)
+    except asyncio.TimeoutError:
+        result = {"status": "timeout"}
+    startup_report.mark("mcp_prewarm", **result)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Avvio e chiusura delle risorse condivise"""
+    # Pre-warm in background: non ritarda l'apertura della porta
+    prewarm = asyncio.create_task(_prewarm_mcp()) if os.getenv("MCP_PREWARM", "1") == "1" else None
+    # Probe periodico del server MCP: /system/health risponde dalla cache
+    health_prober.start()
+    # Stream di notifiche MCP (tools/list_changed invalida la cache del catalogo)
+    if os.getenv("MCP_NOTIFICATIONS", "1") == "1":
+        notification_listener.start()
+    loop_lag_monitor.start()
+    # Snapshot del worker per /metrics aggregato (solo con METRICS_DIR, cioè sotto gunicorn)
+    metrics_flusher.start()
+    # Watchdog dei blocchi dell'event loop (opt-in)
+    if os.getenv("LOOP_WATCHDOG", "0") == "1":
+        watchdog.start()
+    # Indice delle route per /docs-overview e /system/status
+    route_registry.build(app)
+    startup_report.mark("route_registry", routes=len(route_registry.routes))
+    startup_report.mark("app_ready")
+    yield
+    await loop_lag_monitor.stop()
+    await metrics_flusher.stop()
+    await watchdog.stop()
+    if prewarm is not None:
+        prewarm.cancel()
+    await notification_listener.stop()
+    await health_prober.stop()
+    # Chiude il pool di connessioni verso il server MCP
+    await mcp_client.aclose()
 
 app = FastAPI(
     title="MCP System API",
     description="Sistema integrato FastAPI + MCP Server",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    # Descrizioni dei gruppi usate anche da /docs-overview
+    openapi_tags=[
+        {"name": "System", "description": "Endpoints di sistema e monitoraggio"},
+        {"name": "MCP Server", "description": "Endpoints per il server MCP esterno"},
+        {"name": "Claude Test", "description": "Endpoints per test e configurazione Claude"},
+        {"name": "Debug", "description": "Diagnostica del worker"}
+    ],
+    # Serializzazione JSON veloce (orjson se disponibile) per tutte le route
+    default_response_class=FastJSONResponse
 )
+# Le route senza response_model saltano jsonable_encoder
+app.router.route_class = FastJSONRoute
 
 # Configura CORS
 app.add_middleware(
@@ -20,11 +90,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(FirstRequestTimer)
+app.add_middleware(WatchdogMiddleware)
+# Compressione gzip/br/zstd negoziata con Accept-Encoding (streaming compresso chunk per chunk)
+app.add_middleware(CompressionMiddleware)
+# Metriche per route (ultimo aggiunto = più esterno: misura anche CORS)
+app.add_middleware(MetricsMiddleware)
 
 # Include routes organizzate
 app.include_router(system_info.router)
 app.include_router(mcp.router)
 app.include_router(claude.router)
+app.include_router(debug.router)
 
 # ===== ENDPOINTS PRINCIPALI SEMPLIFICATI =====
 
@@ -33,14 +110,17 @@ async def root():
     """Redirect alla documentazione API"""
     return RedirectResponse(url="/docs")
 
+# Risposte costanti: codificate una volta all'avvio, servite come bytes con ETag
+WELCOME_PAYLOAD = StaticPayload({
+    "message": "Benvenuto nel Sistema MCP!",
+    "version": "2.0.0",
+    "description": "Sistema integrato FastAPI + MCP Server"
+}, max_age=300)
+
 @app.get("/welcome")
-async def welcome():
+async def welcome(request: Request):
     """Endpoint di benvenuto"""
-    return {
-        "message": "Benvenuto nel Sistema MCP!",
-        "version": "2.0.0",
-        "description": "Sistema integrato FastAPI + MCP Server"
-    }
+    return WELCOME_PAYLOAD.response(request)
 
 @app.get("/test")
 async def test_endpoint():
@@ -54,45 +134,18 @@ async def test_endpoint():
     }
 
 @app.get("/docs-overview", include_in_schema=False)
-async def docs_overview():
+async def docs_overview(request: Request):
     """Panoramica degli endpoints disponibili"""
-    return {
-        "app": {
-            "description": "Endpoints principali dell'applicazione",
-            "endpoints": {
-                "GET /": "Redirect alla documentazione",
-                "GET /welcome": "Messaggio di benvenuto", 
-                "GET /test": "Test funzioni decorate locali",
-                "GET /docs": "Documentazione automatica Swagger",
-                "GET /docs-overview": "Questa panoramica"
-            }
-        },
-        "system": {
-            "description": "Endpoints di sistema e monitoraggio",
-            "endpoints": {
-                "GET /system/health": "Health check completo sistema",
-                "GET /system/status": "Status riepilogativo",
-                "GET /system/test-v0": "Test completo FastAPI (V0)",
-                "GET /system/test-v1": "Test completo MCP Server (V1)"
-            }
-        },
-        "mcp": {
-            "description": "Endpoints per il server MCP esterno",
-            "endpoints": {
-                "GET /mcp/test": "Test connessione MCP Server",
-                "GET /mcp/tools": "Lista tools disponibili MCP",
-                "GET /mcp/full-test": "Test completo MCP Server", 
-                "GET /mcp/health": "Health check MCP Server"
-            }
-        },
-        "claude": {
-            "description": "Endpoints per test e configurazione Claude",
-            "endpoints": {
-                "GET /test/test-claude": "Test configurazione Claude Desktop",
-                "GET /test/claude-config": "Configurazione JSON per Claude"
-            }
-        }
-    }
+    # Generata dalle route registrate e serializzata una volta
+    payload = route_registry.for_app(request.app).cached(
+        "docs_overview", lambda registry: StaticPayload(registry.overview(), max_age=300)
+    )
+    return payload.response(request)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Metriche in formato testo Prometheus (somma di tutti i worker con METRICS_DIR)"""
+    return PlainTextResponse(metrics.collect().render(), media_type="text/plain; version=0.0.4")
 
 # Health check compatibilità (mantenimento retrocompatibilità)
 @app.get("/health")
@@ -120,10 +173,10 @@ async def test_v1_legacy():
     return await test_v1()
 
 @app.get("/status")
-async def status_legacy():
+async def status_legacy(request: Request):
     """Status legacy - usa /system/status per la versione nuova"""
     from modules.routes.system_info import overall_status  # ← CORRETTO
-    return await overall_status()
+    return await overall_status(request)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 import requests
 import json
+import os
 from datetime import datetime
 from modules.test import esegui_test_completo
+from modules.mcp_client.sse import parse_sse_text
 
 app = FastAPI()
 
 # URL del MCP Server
-MCP_SERVER_URL = "https://test-mcp-prodv1.fly.dev"
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "https://test-mcp-prodv1.fly.dev")
 
 # Headers corretti per MCP
 MCP_HEADERS = {
@@ -17,27 +19,7 @@ MCP_HEADERS = {
 
 def parse_sse_response(response_text):
     """Parsa una risposta SSE (Server-Sent Events)"""
-    events = []
-    lines = response_text.strip().split('\n')
-    
-    current_event = {}
-    for line in lines:
-        if line.startswith('event:'):
-            current_event['event'] = line[6:].strip()
-        elif line.startswith('data:'):
-            data_content = line[5:].strip()
-            try:
-                current_event['data'] = json.loads(data_content)
-            except json.JSONDecodeError:
-                current_event['data'] = data_content
-        elif line == '' and current_event:
-            events.append(current_event)
-            current_event = {}
-    
-    if current_event:
-        events.append(current_event)
-    
-    return events
+    return parse_sse_text(response_text)
 
 @app.get("/welcome")
 async def welcome():
@@ -1,15 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 
 # Import routes organizzate
 from modules.routes import mcp, system_info, claude
+from modules.routes.registry import route_registry
+from modules.responses import StaticPayload
 from modules.test import esegui_test_completo
 
 app = FastAPI(
     title="MCP System API",
     description="Sistema integrato FastAPI + MCP Server",
-    version="2.0.0"
+    version="2.0.0",
+    openapi_tags=[
+        {"name": "System", "description": "Endpoints di sistema e monitoraggio"},
+        {"name": "MCP Server", "description": "Endpoints per il server MCP esterno"},
+        {"name": "Claude Test", "description": "Endpoints per test e configurazione Claude"}
+    ]
 )
 
 # Configura CORS
@@ -24,6 +31,7 @@ app.add_middleware(
 # Include routes organizzate
 app.include_router(mcp.router)
 app.include_router(system_info.router)
+app.include_router(claude.router)
 
 # ===== ENDPOINTS PRINCIPALI SEMPLIFICATI =====
 
@@ -53,38 +61,13 @@ async def test_endpoint():
     }
 
 @app.get("/docs-overview", include_in_schema=False)
-async def docs_overview():
+async def docs_overview(request: Request):
     """Panoramica degli endpoints disponibili"""
-    return {
-        "app": {
-            "description": "Endpoints principali dell'applicazione",
-            "endpoints": {
-                "GET /": "Redirect alla documentazione",
-                "GET /welcome": "Messaggio di benvenuto", 
-                "GET /test": "Test funzioni decorate locali",
-                "GET /docs": "Documentazione automatica Swagger",
-                "GET /docs-overview": "Questa panoramica"
-            }
-        },
-        "system": {
-            "description": "Endpoints di sistema e monitoraggio",
-            "endpoints": {
-                "GET /system/health": "Health check completo sistema",
-                "GET /system/status": "Status riepilogativo",
-                "GET /system/test-v0": "Test completo FastAPI (V0)",
-                "GET /system/test-v1": "Test completo MCP Server (V1)"
-            }
-        },
-        "mcp": {
-            "description": "Endpoints per il server MCP esterno",
-            "endpoints": {
-                "GET /mcp/test": "Test connessione MCP Server",
-                "GET /mcp/tools": "Lista tools disponibili MCP",
-                "GET /mcp/full-test": "Test completo MCP Server", 
-                "GET /mcp/health": "Health check MCP Server"
-            }
-        }
-    }
+    # Generata dalle route registrate e serializzata una volta
+    payload = route_registry.for_app(request.app).cached(
+        "docs_overview", lambda registry: StaticPayload(registry.overview(), max_age=300)
+    )
+    return payload.response(request)
 
 # Health check compatibilità (mantenimento retrocompatibilità)
 @app.get("/health")
@@ -112,10 +95,10 @@ async def test_v1_legacy():
     return await test_v1()
 
 @app.get("/status")
-async def status_legacy():
+async def status_legacy(request: Request):
     """Status legacy - usa /system/status per la versione nuova"""
     from modules.routes.system_info import overall_status
-    return await overall_status()
+    return await overall_status(request)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,215 @@
+"""Benchmark in-process delle route contro un server MCP finto.
+
+Uso:
+    python -m modules.bench --concurrency 50 --requests 500 --latency-ms 20 --jitter-ms 5
+    python -m modules.bench --compare bench_results/<file>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+
+DEFAULT_ROUTES = [
+    "/welcome",
+    "/system/health",
+    "/mcp/test",
+    "/mcp/tools",
+    "/system/test-v1",
+    "/test/test-claude",
+]
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _percentile(ordered: list, p: float):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+
+class LoopLagSampler:
+    """Misura il ritardo dell'event loop: quanto un sleep breve si risveglia in ritardo"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+        self._started = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append((loop.time() - self._started - self.interval) * 1000)
+
+    def start(self):
+        self.samples = []
+        self._started = asyncio.get_running_loop().time()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        # Sleep ancora in corso: se il loop non l'ha mai risvegliato, anche quello è ritardo
+        pending = (asyncio.get_running_loop().time() - self._started - self.interval) * 1000
+        if pending > 0:
+            self.samples.append(pending)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        ordered = sorted(self.samples)
+        return {
+            "p50_ms": _percentile(ordered, 50),
+            "p99_ms": _percentile(ordered, 99),
+            "max_ms": round(ordered[-1], 3) if ordered else None
+        }
+
+
+async def bench_route(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> dict:
+    """Esegue `requests` GET su `path` con `concurrency` richieste in parallelo"""
+    latencies = []
+    status_codes = {}
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    lag = LoopLagSampler()
+    lag.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    loop_lag = await lag.stop()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": _percentile(ordered, 50),
+        "p95_ms": _percentile(ordered, 95),
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": round(ordered[-1], 3) if ordered else None,
+        "status_codes": {str(code): count for code, count in sorted(status_codes.items())},
+        "errors": errors,
+        "event_loop_lag": loop_lag
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=_ROOT
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+async def run(args) -> dict:
+    # Niente stream di notifiche verso il server reale durante il benchmark
+    os.environ.setdefault("MCP_NOTIFICATIONS", "0")
+
+    import main
+    from modules.fake_mcp.server import FakeMCPConfig, create_app
+    from modules.mcp_client.mcp_client import mcp_client
+    from modules.mcp_client.transport import MCPTransport
+
+    fake = create_app(FakeMCPConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        tool_count=args.tool_count,
+        response_size=args.response_size,
+        event_delay_ms=args.event_delay_ms
+    ))
+    mcp_client.transport = MCPTransport(http_transport=httpx.ASGITransport(app=fake))
+
+    results = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for path in args.routes:
+                if args.warmup:
+                    await bench_route(client, path, args.warmup, min(args.concurrency, args.warmup))
+                results[path] = await bench_route(client, path, args.requests, args.concurrency)
+                row = results[path]
+                print(f"{path:<22} {row['req_per_s']:>9} req/s  p50 {row['p50_ms']:>8} ms  "
+                      f"p95 {row['p95_ms']:>8} ms  p99 {row['p99_ms']:>8} ms  "
+                      f"loop lag p99 {row['event_loop_lag']['p99_ms']} ms")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("compare", "output")}
+        },
+        "routes": results
+    }
+
+
+def compare(current: dict, baseline_path: str):
+    """Confronta req/s e p95 con un risultato salvato in precedenza"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nConfronto con {baseline_path} (commit {baseline['meta'].get('commit')})")
+    for path, row in current["routes"].items():
+        before = baseline["routes"].get(path)
+        if not before:
+            continue
+        rps = (row["req_per_s"] - before["req_per_s"]) / before["req_per_s"] * 100 if before["req_per_s"] else 0
+        p95 = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+        print(f"{path:<22} req/s {rps:+7.1f}%   p95 {p95:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark delle route con server MCP finto")
+    parser.add_argument("--routes", nargs="+", default=DEFAULT_ROUTES)
+    parser.add_argument("--requests", type=int, default=200, help="richieste per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10, help="richieste di riscaldamento per route")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="latenza del server MCP finto")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-count", type=int, default=3, help="tools esposti dal server finto")
+    parser.add_argument("--response-size", type=int, default=0, help="byte di padding nelle risposte MCP")
+    parser.add_argument("--event-delay-ms", type=float, default=0.0, help="ritardo tra eventi SSE")
+    parser.add_argument("--output", help="file JSON dei risultati (default bench_results/<data>_<commit>.json)")
+    parser.add_argument("--compare", help="risultato JSON precedente da confrontare")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    output = args.output
+    if not output:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(_ROOT, "bench_results", f"{stamp}_{result['meta']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nRisultati salvati in {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
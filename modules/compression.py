@@ -0,0 +1,202 @@
+"""Compressione delle risposte negoziata con Accept-Encoding.
+
+- gzip sempre disponibile; brotli e zstd se i pacchetti sono installati e il client li offre
+- sotto COMPRESSION_MIN_SIZE byte le risposte complete escono invariate
+- le risposte in streaming (SSE, NDJSON) sono compresse chunk per chunk con flush: nessun buffering
+- le risposte che hanno già Content-Encoding (es. varianti precompresse di StaticPayload) non si toccano
+"""
+import gzip
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Ordine di preferenza del server a parità di q; COMPRESSION_ENCODINGS="" disattiva la compressione
+_INSTALLED = {"zstd": zstandard is not None, "br": brotli is not None, "gzip": True}
+ENCODINGS = tuple(
+    name for name in (item.strip() for item in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(","))
+    if _INSTALLED.get(name)
+)
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+# Livelli per le risposte dinamiche (veloci) e per quelle statiche, compresse una volta sola
+LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+STATIC_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+
+# Contatori del worker (esposti in /debug/counters)
+stats = {"compressed": 0, "streamed": 0, "static_variants": 0, "bytes_in": 0, "bytes_out": 0}
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml")
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Accept-Encoding → {codifica: q}"""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+
+def choose_encoding(header: str, encodings: tuple = None):
+    """Codifica con q più alto tra quelle disponibili (None: nessuna compressione)"""
+    if not header:
+        return None
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ENCODINGS if encodings is None else encodings:
+        q = codings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(_COMPRESSIBLE) or "+json" in content_type
+
+
+def compress_bytes(encoding: str, data: bytes, level: int = None) -> bytes:
+    """Compressione in un colpo solo di un body completo"""
+    level = LEVELS[encoding] if level is None else level
+    if encoding == "gzip":
+        # mtime=0: stesso input, stessi byte (varianti in cache confrontabili)
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class StreamCompressor:
+    """Compressore incrementale: ogni chunk esce subito decodificabile (flush di sincronizzazione)"""
+
+    def __init__(self, encoding: str, level: int = None):
+        self.encoding = encoding
+        level = LEVELS[encoding] if level is None else level
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush()
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.finish()
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def mark_encoded(headers: MutableHeaders, encoding: str):
+    """Header di una risposta compressa: Content-Encoding ed ETag debole (i byte cambiano per codifica)"""
+    headers["Content-Encoding"] = encoding
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+class CompressionMiddleware:
+    """Middleware ASGI di compressione delle risposte (gzip, br, zstd)"""
+
+    def __init__(self, app, minimum_size: int = None, encodings: tuple = None):
+        self.app = app
+        self.minimum_size = MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.encodings = ENCODINGS if encodings is None else encodings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    return await send(message)
+                headers.add_vary_header("Accept-Encoding")
+                # Start trattenuto finché non si sa se il body va compresso
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                if not more_body:
+                    # Body completo in un solo messaggio
+                    passthrough = True
+                    if len(body) < self.minimum_size:
+                        await send(start)
+                        return await send(message)
+                    compressed = compress_bytes(encoding, body)
+                    stats["compressed"] += 1
+                    stats["bytes_in"] += len(body)
+                    stats["bytes_out"] += len(compressed)
+                    mark_encoded(headers, encoding)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": compressed})
+                # Streaming: lunghezza ignota, chunk compressi man mano
+                compressor = StreamCompressor(encoding)
+                stats["streamed"] += 1
+                mark_encoded(headers, encoding)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start)
+
+            data = compressor.compress(body) if more_body else compressor.finish(body)
+            stats["bytes_in"] += len(body)
+            stats["bytes_out"] += len(data)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def snapshot() -> dict:
+    return {"encodings": list(ENCODINGS), "minimum_size": MINIMUM_SIZE, **stats}
@@ -0,0 +1 @@
+# Fake MCP server package
@@ -0,0 +1,40 @@
+import argparse
+
+import uvicorn
+
+from .server import FakeMCPConfig, create_app
+
+parser = argparse.ArgumentParser(description="Server MCP finto per test offline e benchmark")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=9000)
+parser.add_argument("--latency-ms", type=float, default=0.0)
+parser.add_argument("--jitter-ms", type=float, default=0.0)
+parser.add_argument("--error-rate", type=float, default=0.0, help="quota di risposte HTTP 503")
+parser.add_argument("--rpc-error-rate", type=float, default=0.0, help="quota di errori JSON-RPC")
+parser.add_argument("--drop-rate", type=float, default=0.0, help="quota di stream interrotti")
+parser.add_argument("--tool-count", type=int, default=3)
+parser.add_argument("--response-size", type=int, default=0, help="byte di padding nelle risposte")
+parser.add_argument("--event-delay-ms", type=float, default=0.0)
+parser.add_argument("--progress-events", type=int, default=0)
+parser.add_argument("--require-session", action="store_true")
+parser.add_argument("--no-get-stream", action="store_true", help="GET /mcp risponde 405")
+parser.add_argument("--notify-interval", type=float, default=0.0)
+parser.add_argument("--no-batch", action="store_true", help="rifiuta i batch JSON-RPC con 400")
+args = parser.parse_args()
+
+config = FakeMCPConfig(
+    latency_ms=args.latency_ms,
+    jitter_ms=args.jitter_ms,
+    error_rate=args.error_rate,
+    tool_count=args.tool_count,
+    response_size=args.response_size,
+    event_delay_ms=args.event_delay_ms,
+    progress_events=args.progress_events,
+    rpc_error_rate=args.rpc_error_rate,
+    drop_rate=args.drop_rate,
+    require_session=args.require_session,
+    get_stream=not args.no_get_stream,
+    notify_interval=args.notify_interval,
+    batch=not args.no_batch,
+)
+uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
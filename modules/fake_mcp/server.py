@@ -0,0 +1,225 @@
+"""Server MCP finto (Streamable HTTP + SSE) per test offline e benchmark.
+
+Uso standalone:
+    python -m modules.fake_mcp --port 9000 --tool-count 50 --response-size 20000
+    MCP_SERVER_URL=http://127.0.0.1:9000 uvicorn main:app
+"""
+import asyncio
+import json
+import random
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+
+class FakeMCPConfig:
+    """Parametri del server MCP finto"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        tool_count: int = 3,
+        response_size: int = 0,
+        event_delay_ms: float = 0.0,
+        progress_events: int = 0,
+        rpc_error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        require_session: bool = False,
+        get_stream: bool = True,
+        notify_interval: float = 0.0,
+        batch: bool = True,
+    ):
+        self.latency_ms = latency_ms  # latenza prima della risposta
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate  # quota di risposte HTTP 503
+        self.tool_count = tool_count
+        self.response_size = response_size  # byte di padding in tools/list e tools/call
+        self.event_delay_ms = event_delay_ms  # ritardo tra un evento SSE e il successivo
+        self.progress_events = progress_events  # notifiche di progresso prima del risultato di tools/call
+        self.rpc_error_rate = rpc_error_rate  # quota di errori JSON-RPC (HTTP 200)
+        self.drop_rate = drop_rate  # quota di stream chiusi prima del risultato
+        self.require_session = require_session  # 404 se manca o è sconosciuto Mcp-Session-Id
+        self.get_stream = get_stream  # False: GET /mcp risponde 405
+        self.notify_interval = notify_interval  # secondi tra due tools/list_changed sullo stream GET
+        self.batch = batch  # False: i batch JSON-RPC (array) ricevono 400 con errore id null
+
+
+def _padding(size: int) -> str:
+    return "x" * size if size > 0 else ""
+
+
+def _tools(count: int, response_size: int) -> list:
+    # Il padding è distribuito sulle descrizioni per raggiungere circa response_size byte
+    padding = _padding(response_size // max(count, 1))
+    return [
+        {
+            "name": f"tool_{i}",
+            "description": f"Tool di test numero {i} {padding}".rstrip(),
+            "inputSchema": {
+                "type": "object",
+                "properties": {"text": {"type": "string"}},
+                "required": ["text"]
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def _sse(message: dict, event_id: int = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: message\ndata: {json.dumps(message)}\n\n".encode("utf-8")
+
+
+def create_app(config: FakeMCPConfig = None) -> Starlette:
+    """Server MCP finto che risponde in SSE come il server di produzione"""
+    config = config or FakeMCPConfig()
+    tools = _tools(config.tool_count, config.response_size)
+    tool_names = {tool["name"] for tool in tools}
+    sessions = set()
+    # Connessioni TCP distinte viste (host, porta del client): verifica del riuso keep-alive
+    peers = set()
+    stats = {"requests": 0, "initialize": 0, "tools/list": 0, "tools/call": 0, "errors": 0}
+
+    async def delay():
+        latency = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def error(message: dict, code: int, text: str) -> dict:
+        return {"jsonrpc": "2.0", "id": message.get("id"), "error": {"code": code, "message": text}}
+
+    def handle(message: dict, session_id: str):
+        """Restituisce (risultato o errore, notifiche da inviare prima, nuova sessione)"""
+        method = message.get("method")
+        stats[method] = stats.get(method, 0) + 1
+
+        if method == "initialize":
+            new_session = uuid.uuid4().hex
+            sessions.add(new_session)
+            result = {
+                "protocolVersion": message.get("params", {}).get("protocolVersion", "2024-11-05"),
+                "capabilities": {"tools": {"listChanged": True}},
+                "serverInfo": {"name": "fake-mcp", "version": "1.0.0"},
+                "sessionId": new_session
+            }
+            return {"jsonrpc": "2.0", "id": message.get("id"), "result": result}, [], new_session
+
+        if config.rpc_error_rate and random.random() < config.rpc_error_rate:
+            return error(message, -32603, "Errore interno simulato"), [], None
+        if method == "ping":
+            return {"jsonrpc": "2.0", "id": message.get("id"), "result": {}}, [], None
+        if method == "tools/list":
+            return {"jsonrpc": "2.0", "id": message.get("id"), "result": {"tools": tools}}, [], None
+        if method == "tools/call":
+            params = message.get("params", {})
+            name = params.get("name")
+            if name not in tool_names:
+                return error(message, -32602, f"Tool sconosciuto: {name}"), [], None
+            token = params.get("_meta", {}).get("progressToken")
+            progress = [
+                {
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {"progressToken": token, "progress": i + 1, "total": config.progress_events}
+                }
+                for i in range(config.progress_events if token is not None else 0)
+            ]
+            text = json.dumps(params.get("arguments", {})) + _padding(config.response_size)
+            result = {"content": [{"type": "text", "text": text}], "isError": False}
+            return {"jsonrpc": "2.0", "id": message.get("id"), "result": result}, progress, None
+        return error(message, -32601, "Method not found"), [], None
+
+    async def post_mcp(request: Request):
+        stats["requests"] += 1
+        if request.client:
+            peers.add((request.client.host, request.client.port))
+        await delay()
+        if config.error_rate and random.random() < config.error_rate:
+            stats["errors"] += 1
+            return Response("Errore simulato", status_code=503)
+
+        body = await request.json()
+        session_id = request.headers.get("mcp-session-id")
+
+        if isinstance(body, list):
+            stats["batches"] = stats.get("batches", 0) + 1
+            if not config.batch:
+                rejected = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Batch non supportato"}}
+                return Response(json.dumps(rejected), status_code=400, media_type="application/json")
+            messages = body
+        else:
+            messages = [body]
+
+        # Notifiche del client (es. notifications/initialized): nessuna risposta
+        messages = [message for message in messages if "id" in message]
+        if not messages:
+            return Response(status_code=202)
+        needs_session = any(message.get("method") != "initialize" for message in messages)
+        if config.require_session and needs_session and session_id not in sessions:
+            return Response("Session not found", status_code=404)
+
+        results = [handle(message, session_id) for message in messages]
+        new_session = next((result[2] for result in results if result[2]), None)
+        headers = {"mcp-session-id": new_session} if new_session else {}
+        drop = config.drop_rate and random.random() < config.drop_rate
+
+        async def stream():
+            # Batch: una risposta per evento SSE, nell'ordine delle richieste
+            for response, notifications, _ in results:
+                for notification in notifications:
+                    yield _sse(notification)
+                    if config.event_delay_ms:
+                        await asyncio.sleep(config.event_delay_ms / 1000)
+                if drop:
+                    return  # stream interrotto prima del risultato
+                yield _sse(response)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+    async def get_mcp(request: Request):
+        if not config.get_stream:
+            return Response(status_code=405)
+        if config.require_session and request.headers.get("mcp-session-id") not in sessions:
+            return Response("Session not found", status_code=404)
+        last_id = request.headers.get("last-event-id")
+        start = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+
+        async def stream():
+            event_id = start
+            while True:
+                if config.notify_interval:
+                    await asyncio.sleep(config.notify_interval)
+                    yield _sse({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}, event_id)
+                    event_id += 1
+                else:
+                    await asyncio.sleep(15)
+                    yield b": keep-alive\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def delete_mcp(request: Request):
+        sessions.discard(request.headers.get("mcp-session-id"))
+        return Response(status_code=204)
+
+    async def root(request: Request):
+        return Response(status_code=404)
+
+    async def fake_stats(request: Request):
+        return Response(json.dumps({**stats, "sessions": len(sessions), "connections": len(peers)}), media_type="application/json")
+
+    app = Starlette(routes=[
+        Route("/", root, methods=["GET", "HEAD"]),
+        Route("/mcp", post_mcp, methods=["POST"]),
+        Route("/mcp", get_mcp, methods=["GET"]),
+        Route("/mcp", delete_mcp, methods=["DELETE"]),
+        Route("/sse", post_mcp, methods=["POST"]),
+        Route("/_stats", fake_stats, methods=["GET"]),
+    ])
+    app.state.config = config
+    app.state.stats = stats
+    return app
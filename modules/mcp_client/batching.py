@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+
+def batch_rejected(response) -> bool:
+    """True se il server non accetta batch JSON-RPC (HTTP 4xx o errore con id null al posto delle risposte)"""
+    if response.session_invalid:
+        return False
+    if response.status_code in (400, 405, 413, 415, 422, 501):
+        return True
+    return response.status_code == 200 and list(response.messages) == [None]
+
+
+class AutoBatcher:
+    """Raggruppa le chiamate di sessione emesse entro una finestra breve in un unico batch JSON-RPC"""
+
+    def __init__(self, client, window_ms: float = None, max_size: int = None):
+        self.client = client
+        # Opt-in (default 0): la finestra ritarda ogni chiamata di sessione e conviene solo con molte chiamate
+        # non idempotenti ravvicinate; quelle idempotenti identiche sono già unite dal single-flight
+        self.window = (window_ms if window_ms is not None else float(os.getenv("MCP_BATCH_WINDOW_MS", "0"))) / 1000
+        self.max_size = max_size or int(os.getenv("MCP_BATCH_MAX", "20"))
+        self._pending = {}  # server_url -> [(payload, future)]
+        self._timers = {}
+        self._tasks = set()
+        self.stats = {"batches": 0, "batched_calls": 0, "single_calls": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def submit(self, server_url: str, payload: dict):
+        """Accoda la chiamata e attende la sua MCPResponse"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(server_url, [])
+        pending.append((payload, future))
+        if len(pending) >= self.max_size:
+            self._flush(server_url)
+        elif server_url not in self._timers:
+            self._timers[server_url] = loop.call_later(self.window, self._flush, server_url)
+        return await future
+
+    def _flush(self, server_url: str):
+        timer = self._timers.pop(server_url, None)
+        if timer is not None:
+            timer.cancel()
+        # Chiamanti già annullati: la loro richiesta non parte
+        items = [(payload, future) for payload, future in self._pending.pop(server_url, []) if not future.done()]
+        if items:
+            task = asyncio.ensure_future(self._send(server_url, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, server_url: str, items: list):
+        try:
+            if len(items) == 1:
+                self.stats["single_calls"] += 1
+                responses = [await self.client._session_rpc_once(items[0][0], server_url)]
+            else:
+                self.stats["batches"] += 1
+                self.stats["batched_calls"] += len(items)
+                responses = await self.client._session_batch([payload for payload, _ in items], server_url)
+        except asyncio.CancelledError:
+            for _, future in items:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), response in zip(items, responses):
+            if not future.done():
+                future.set_result(response)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "window_ms": round(self.window * 1000, 2),
+            "max_size": self.max_size,
+            **self.stats
+        }
@@ -0,0 +1,90 @@
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Chiamata rifiutata subito perché il circuit breaker è aperto"""
+
+    def __init__(self, server_url: str, retry_after: float):
+        super().__init__(f"Circuit breaker aperto per {server_url}: nuovo tentativo tra {retry_after:.1f}s")
+        self.server_url = server_url
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Circuit breaker closed/open/half-open basato sul tasso di errore delle ultime chiamate"""
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 15.0, half_open_calls: int = 1):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.outcomes = deque(maxlen=window)  # True = errore
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.half_open_inflight = 0
+        self.rejected = 0
+        self.transitions = 0
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.transitions += 1
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """True se la chiamata può partire; in half-open passa solo un numero limitato di probe"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                return False
+            self._set_state(HALF_OPEN)
+            self.half_open_inflight = 0
+        if self.state == HALF_OPEN:
+            if self.half_open_inflight >= self.half_open_calls:
+                self.rejected += 1
+                return False
+            self.half_open_inflight += 1
+        return True
+
+    def record(self, ok: bool):
+        """Registra l'esito di una chiamata autorizzata da allow()"""
+        if self.state == HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+            if ok:
+                self.outcomes.clear()
+                self._set_state(CLOSED)
+            else:
+                self._trip()
+            return
+
+        self.outcomes.append(not ok)
+        if len(self.outcomes) >= self.min_calls and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate:
+            self._trip()
+
+    def release(self):
+        """Chiamata annullata (es. client disconnesso): non conta come esito"""
+        if self.state == HALF_OPEN:
+            self.half_open_inflight = max(0, self.half_open_inflight - 1)
+
+    def _trip(self):
+        self.opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def snapshot(self) -> dict:
+        failures = sum(self.outcomes)
+        return {
+            "state": self.state,
+            "failure_rate": round(failures / len(self.outcomes), 3) if self.outcomes else 0.0,
+            "window_calls": len(self.outcomes),
+            "retry_after_s": round(self.retry_after(), 1) if self.state == OPEN else 0.0,
+            "rejected": self.rejected,
+            "transitions": self.transitions
+        }
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import time
+
+
+def compute_etag(data) -> str:
+    """ETag forte dal JSON canonico del contenuto"""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return '"' + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Confronto If-None-Match (lista separata da virgole, prefisso W/ e *)"""
+    if not if_none_match or not etag:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CatalogEntry:
+    """Catalogo tools in cache con la sua versione.
+    In passthrough conserva i byte ricevuti dal server, inoltrati così come sono"""
+
+    def __init__(self, tools_data: dict = None, events: list = None, encoded: tuple = None):
+        if tools_data is None:
+            # Passthrough: una sola decodifica per voce di cache, che valida i byte del server
+            # e dà lo stesso ETag del percorso decodificato (ValueError se il JSON non è valido)
+            tools_data = json.loads(encoded[0])
+        self._tools_data = tools_data
+        self._events = events
+        self._encoded = encoded  # (tools_json, events_json)
+        self.etag = compute_etag(tools_data.get("result", tools_data))
+        self.fetched_at = time.monotonic()
+
+    @property
+    def tools_data(self) -> dict:
+        return self._tools_data
+
+    @property
+    def events(self) -> list:
+        if self._events is None:
+            self._events = json.loads(self._encoded[1])
+        return self._events
+
+    def encoded(self, dumps) -> tuple:
+        """(tools_data, events) già serializzati, calcolati una volta per voce di cache"""
+        if self._encoded is None:
+            self._encoded = (dumps(self._tools_data), dumps(self._events))
+        return self._encoded
+
+
+class ToolCatalogCache:
+    """Cache di tools/list per (URL server, versione protocollo) con TTL e invalidazione esplicita"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, server_url: str, protocol_version: str) -> CatalogEntry:
+        entry = self._entries.get((server_url, protocol_version))
+        if entry is None or time.monotonic() - entry.fetched_at > self.ttl:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, server_url: str, protocol_version: str, tools_data: dict, events: list) -> CatalogEntry:
+        entry = CatalogEntry(tools_data, events)
+        self._entries[(server_url, protocol_version)] = entry
+        return entry
+
+    def put_encoded(self, server_url: str, protocol_version: str, tools_json: bytes, events_json: bytes) -> CatalogEntry:
+        """Salva il catalogo come byte ricevuti dal server (passthrough)"""
+        entry = CatalogEntry(encoded=(tools_json, events_json))
+        self._entries[(server_url, protocol_version)] = entry
+        return entry
+
+    def invalidate(self, server_url: str = None):
+        """Rimuove il catalogo di un server (tutte le versioni) o l'intera cache"""
+        keys = [key for key in self._entries if server_url is None or key[0] == server_url]
+        for key in keys:
+            del self._entries[key]
+        self.stats["invalidations"] += 1
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+
+class HealthProber:
+    """Verifica periodica della raggiungibilità del server MCP con risultato in cache"""
+
+    def __init__(self, client, interval: float = None, max_age: float = None, probe_timeout: float = 5.0):
+        self.client = client
+        self.interval = interval or float(os.getenv("MCP_HEALTH_INTERVAL", "15"))
+        # Oltre max_age secondi il risultato viene marcato come stale
+        self.max_age = max_age or self.interval * 3
+        self.probe_timeout = probe_timeout
+        self._result = None
+        self._checked_at = None
+        self._checked_monotonic = 0.0
+        self._inflight = None
+        self._task = None
+
+    async def _probe(self) -> dict:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(self.client.test_connection(), self.probe_timeout)
+            status = "healthy" if detail.get("status") == "success" else "unhealthy"
+        except Exception as e:
+            detail = {"status": "error", "error": str(e) or type(e).__name__}
+            status = "unreachable"
+
+        self._result = {
+            "status": status,
+            "probe_ms": round((time.perf_counter() - started) * 1000, 2),
+            "detail": detail
+        }
+        self._checked_at = datetime.now()
+        self._checked_monotonic = time.monotonic()
+        return self._result
+
+    def refresh(self) -> asyncio.Task:
+        """Avvia un probe; le richieste concorrenti condividono lo stesso task"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._probe())
+        return self._inflight
+
+    @property
+    def stale(self) -> bool:
+        return self._result is None or time.monotonic() - self._checked_monotonic > self.max_age
+
+    def snapshot(self) -> dict:
+        """Ultimo risultato disponibile, senza I/O"""
+        if self._result is None:
+            return {"status": "unknown", "checked_at": None, "age_seconds": None, "stale": True}
+        return {
+            **self._result,
+            "checked_at": self._checked_at.isoformat(),
+            "age_seconds": round(time.monotonic() - self._checked_monotonic, 3),
+            "stale": self.stale
+        }
+
+    async def get(self) -> dict:
+        """Risultato in cache; attende un probe solo se non ne esiste ancora nessuno"""
+        if self._result is None:
+            await asyncio.shield(self.refresh())
+        elif self.stale:
+            # stale-while-revalidate: risponde subito e aggiorna in background
+            self.refresh()
+        return self.snapshot()
+
+    async def _run(self):
+        while True:
+            await asyncio.shield(self.refresh())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Avvia il probe periodico in background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Ferma il probe periodico"""
+        for task in (self._task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._inflight = None
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import random
+
+import httpx
+
+from .sse import SSEDecoder
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener:
+    """Stream SSE persistente (GET) per server MCP: inoltra le notifiche ai subscriber in-process"""
+
+    def __init__(self, client, min_backoff: float = 1.0, max_backoff: float = 60.0, idle_timeout: float = 300.0):
+        self.client = client
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        # Senza eventi per idle_timeout secondi la connessione viene riaperta
+        self.timeout = httpx.Timeout(connect=client.transport.timeout.connect, read=idle_timeout, write=5.0, pool=5.0)
+        self._tasks = {}
+        self._subscribers = []
+        self.state = {}
+
+    def subscribe(self, methods: list = None, maxsize: int = 100) -> asyncio.Queue:
+        """Registra un subscriber; riceve {"server_url", "message"} per i metodi indicati (tutti se None)"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append((queue, set(methods) if methods else None))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [(q, m) for q, m in self._subscribers if q is not queue]
+
+    def publish(self, server_url: str, message: dict):
+        """Consegna una notifica a tutti i subscriber interessati (scarta se la coda è piena)"""
+        method = message.get("method")
+        for queue, methods in self._subscribers:
+            if methods is not None and method not in methods:
+                continue
+            try:
+                queue.put_nowait({"server_url": server_url, "message": message})
+            except asyncio.QueueFull:
+                self._state(server_url)["dropped"] += 1
+
+    def _state(self, server_url: str) -> dict:
+        state = self.state.get(server_url)
+        if state is None:
+            state = self.state[server_url] = {
+                "status": "stopped",
+                "connects": 0,
+                "notifications": 0,
+                "dropped": 0,
+                "last_event_id": None,
+                "last_error": None
+            }
+        return state
+
+    async def _listen(self, server_url: str):
+        state = self._state(server_url)
+        backoff = self.min_backoff
+        session = None
+        # Tra una connessione e l'altra sopravvivono solo l'ultimo id e il retry del server
+        last_event_id = None
+        retry = None
+
+        while True:
+            # Decoder nuovo per ogni connessione: i resti di uno stream interrotto non si incollano al successivo
+            decoder = SSEDecoder()
+            decoder.last_event_id = last_event_id
+            decoder.retry = retry
+            try:
+                if session is None:
+                    session = await self.client._open_session(server_url)
+
+                headers = {"Accept": "text/event-stream", **session.headers()}
+                if last_event_id:
+                    headers["Last-Event-ID"] = last_event_id
+
+                async with self.client.transport.stream("GET", f"{server_url}/mcp", headers=headers, timeout=self.timeout) as response:
+                    if response.status_code == 405:
+                        # Il server non offre lo stream GET: niente da ascoltare
+                        state["status"] = "unsupported"
+                        return
+                    if response.status_code in (400, 404):
+                        session = None  # sessione scaduta: re-initialize
+                        raise RuntimeError(f"HTTP {response.status_code}")
+                    if response.status_code != 200:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+
+                    state["status"] = "connected"
+                    state["connects"] += 1
+                    backoff = self.min_backoff
+
+                    async for chunk in response.aiter_bytes():
+                        for event in decoder.feed(chunk):
+                            self._dispatch(server_url, event)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state["last_error"] = str(e) or type(e).__name__
+                logger.warning("MCP notification stream %s: %s", server_url, state["last_error"])
+            last_event_id = decoder.last_event_id
+            retry = decoder.retry
+
+            # Riconnessione con backoff esponenziale + jitter (retry: del server come minimo)
+            state["status"] = "reconnecting"
+            delay = max(backoff, (retry or 0) / 1000)
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _dispatch(self, server_url: str, event):
+        state = self.state[server_url]
+        state["last_event_id"] = event.id or state["last_event_id"]
+        try:
+            message = json.loads(event.data)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if not isinstance(message, dict) or "method" not in message:
+            return
+        state["notifications"] += 1
+        self.client._on_notification(server_url, message)
+        self.publish(server_url, message)
+
+    def start(self, server_url: str = None):
+        """Apre (una sola volta) lo stream di notifiche verso un server"""
+        server_url = server_url or self.client.mcp_url
+        task = self._tasks.get(server_url)
+        if task is None or task.done():
+            self._state(server_url)["status"] = "connecting"
+            self._tasks[server_url] = asyncio.create_task(self._listen(server_url))
+
+    async def stop(self):
+        """Chiude tutti gli stream"""
+        for task in self._tasks.values():
+            task.cancel()
+        for server_url, task in self._tasks.items():
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.state[server_url]["status"] = "stopped"
+        self._tasks.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "servers": {url: dict(state) for url, state in self.state.items()}
+        }
@@ -1,140 +1,526 @@
 # python
-import requests
+import asyncio
+import itertools
 import json
+import os
+import time
 from datetime import datetime
 
+import httpx
+
+from .batching import AutoBatcher, batch_rejected
+from .breaker import OPEN, CircuitBreaker, CircuitOpenError
+from .cache import ToolCatalogCache
+from .health import HealthProber
+from .listener import NotificationListener
+from .sessions import MCPSession, MCPSessionError, MCPSessionManager
+from .singleflight import IDEMPOTENT_METHODS, SingleFlight, request_key
+from .stages import run_stage_graph
+from .sse import SSEDecoder, match_rpc_id, parse_sse_text, rpc_kind
+from .stats import LatencyRegistry
+from .transport import MCPTransport
+from modules.monitoring.metrics import metrics
+
+
+class MCPResponse:
+    """Risposta di una chiamata JSON-RPC al server MCP"""
+
+    def __init__(self, status_code: int, headers=None, events: list = None, message: dict = None, text: str = None,
+                 messages: dict = None, raw: str = None, sse_events: list = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._events = events if events is not None or sse_events is not None else []
+        self._sse_events = sse_events  # eventi SSE non decodificati (passthrough)
+        self._message = message  # messaggio JSON-RPC con l'id della richiesta
+        self._raw = raw  # campo data del messaggio non decodificato (passthrough)
+        self.text = text  # body grezzo, solo per risposte non 200
+        self.messages = messages or {}  # id -> messaggio JSON-RPC (batch)
+
+    @property
+    def message(self) -> dict:
+        """Messaggio JSON-RPC, decodificato al primo accesso se ricevuto in passthrough"""
+        if self._message is None and self._raw is not None:
+            self._message = json.loads(self._raw)
+        return self._message
+
+    @property
+    def events(self) -> list:
+        if self._events is None:
+            self._events = [event.to_dict() for event in self._sse_events]
+        return self._events
+
+    def discard_raw(self):
+        """Abbandona il messaggio ricevuto in passthrough (JSON non valido): resta solo negli eventi"""
+        self._raw = None
+        self._message = None
+
+    @property
+    def raw(self) -> bytes:
+        """Messaggio così come ricevuto dal server (None se non disponibile)"""
+        return self._raw.encode("utf-8") if self._raw is not None else None
+
+    @property
+    def kind(self) -> str:
+        """'result', 'error' o None, senza decodificare il messaggio se possibile"""
+        if self._message is None and self._raw is not None:
+            return rpc_kind(self._raw)
+        message = self._message or {}
+        return "result" if "result" in message else "error" if "error" in message else None
+
+    def events_json(self) -> bytes:
+        """Eventi già serializzati: in passthrough i campi data sono copiati senza decodificarli"""
+        if self._sse_events is not None and self._events is None:
+            return b"[" + b",".join(event.to_raw() for event in self._sse_events) + b"]"
+        return json.dumps(self.events, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @property
+    def session_invalid(self) -> bool:
+        """True se il server ha rifiutato la sessione (scaduta o sconosciuta)"""
+        if self.status_code == 404:
+            return True
+        if self.status_code == 400 and "session" in (self.text or "").lower():
+            return True
+        if self.kind != "error":
+            return False
+        error = self.message.get("error")
+        return isinstance(error, dict) and "session" in str(error.get("message", "")).lower()
+
+
 class MCPClient:
-    def __init__(self, mcp_server_url: str = "https://test-mcp-prodv1.fly.dev"):
-        self.mcp_url = mcp_server_url
+    def __init__(self, mcp_server_url: str = None, transport: MCPTransport = None):
+        # MCP_SERVER_URL permette di puntare a un server locale (es. python -m modules.fake_mcp)
+        self.mcp_url = mcp_server_url or os.getenv("MCP_SERVER_URL", "https://test-mcp-prodv1.fly.dev")
+        self.transport = transport or MCPTransport()
         self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json, text/event-stream"
         }
-        self.session_id = None  # ← AGGIUNGI QUESTA RIGA
-    
+        # Sessioni MCP inizializzate, riusate tra le richieste concorrenti
+        self.sessions = MCPSessionManager(self._open_session, self._close_session)
+        # Latenze e errori per target, esposti nei payload di health
+        self.latency = LatencyRegistry()
+        self.protocol_version = "2024-11-05"
+        # Catalogo tools in cache, invalidato da notifications/tools/list_changed
+        self.tool_cache = ToolCatalogCache()
+        # Circuit breaker per server: fast-fail quando il server MCP è giù
+        self.breakers = {}
+        # Timeout adattivo: p99 osservato × moltiplicatore, tra MCP_TIMEOUT_MIN e il read timeout del trasporto
+        self.timeout_multiplier = float(os.getenv("MCP_TIMEOUT_MULTIPLIER", "4"))
+        self.timeout_min = float(os.getenv("MCP_TIMEOUT_MIN", "1"))
+        # Deadline predefinita di una tools/call (i tool possono durare molto più di una chiamata di controllo)
+        self.tool_call_deadline = float(os.getenv("MCP_TOOL_CALL_DEADLINE", "60"))
+        # Limite globale di tools/call in parallelo dalle chiamate bulk (tutte le richieste del worker)
+        self.bulk_slots = asyncio.BoundedSemaphore(int(os.getenv("MCP_BULK_MAX_CONCURRENCY", "32")))
+        # Passthrough: la risposta si individua cercando l'id nei byte SSE e si decodifica solo se serve
+        self.passthrough = os.getenv("MCP_PASSTHROUGH", "1") == "1"
+        # Chiamate idempotenti identiche e concorrenti condividono un'unica richiesta upstream
+        self.singleflight = SingleFlight()
+        # Id JSON-RPC univoci per processo (le risposte dei batch si associano per id)
+        self._ids = itertools.count(1)
+        # Chiamate di sessione ravvicinate raggruppate in un unico batch JSON-RPC (opt-in: MCP_BATCH_WINDOW_MS)
+        self.batcher = AutoBatcher(self)
+        # Server che hanno rifiutato un batch: da lì in poi solo chiamate singole
+        self.batch_unsupported = set()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def breaker(self, server_url: str = None) -> CircuitBreaker:
+        """Circuit breaker del server (creato al primo uso)"""
+        server_url = server_url or self.mcp_url
+        breaker = self.breakers.get(server_url)
+        if breaker is None:
+            breaker = self.breakers[server_url] = CircuitBreaker(
+                failure_rate=float(os.getenv("MCP_BREAKER_FAILURE_RATE", "0.5")),
+                open_seconds=float(os.getenv("MCP_BREAKER_OPEN_SECONDS", "15"))
+            )
+        return breaker
+
+    def call_timeout(self, target: str) -> float:
+        """Timeout in secondi per una chiamata a target, dalle latenze osservate"""
+        return self.latency.get(target).adaptive_timeout(
+            self.timeout_multiplier, self.timeout_min, self.transport.timeout.read
+        )
+
+    def _circuit_error(self, error: CircuitOpenError) -> dict:
+        return {
+            "status": "error",
+            "error": str(error),
+            "circuit": "open",
+            "retry_after_s": round(error.retry_after, 1)
+        }
+
     def parse_sse_response(self, response_text: str) -> list:
         """Parsa una risposta SSE (Server-Sent Events)"""
-        events = []
-        lines = response_text.strip().split('\n')
-        
-        current_event = {}
-        for line in lines:
-            if line.startswith('event:'):
-                current_event['event'] = line[6:].strip()
-            elif line.startswith('data:'):
-                data_content = line[5:].strip()
-                try:
-                    current_event['data'] = json.loads(data_content)
-                except json.JSONDecodeError:
-                    current_event['data'] = data_content
-            elif line == '' and current_event:
-                events.append(current_event)
-                current_event = {}
-        
-        if current_event:
-            events.append(current_event)
-        
-        return events
-    
-    async def initialize_mcp(self) -> dict:
-        """Inizializza la connessione MCP e memorizza session ID"""
+        return parse_sse_text(response_text)
+
+    async def _rpc(self, payload: dict, headers: dict = None, server_url: str = None, path: str = "/mcp") -> MCPResponse:
+        """Invia una richiesta JSON-RPC; le richieste idempotenti identiche già in corso vengono condivise"""
+        server_url = server_url or self.mcp_url
+        method = payload.get("method") if isinstance(payload, dict) else None
+        if method not in IDEMPOTENT_METHODS:
+            return await self._rpc_guarded(payload, headers, server_url, path)
+        session_id = (headers or {}).get("Mcp-Session-Id")
+        key = request_key(server_url, method, payload.get("params"), path, session_id)
+        return await self.singleflight.do(key, lambda: self._rpc_guarded(payload, headers, server_url, path))
+
+    async def _rpc_guarded(self, payload: dict, headers: dict, server_url: str, path: str) -> MCPResponse:
+        """Invia una richiesta JSON-RPC e legge lo stream SSE fino alla risposta con lo stesso id.
+        Protetta dal circuit breaker del server e limitata da un timeout adattivo"""
+        breaker = self.breaker(server_url)
+        if not breaker.allow():
+            raise CircuitOpenError(server_url, breaker.retry_after())
+
+        target = f"{server_url}{path}"
+        timeout = self.call_timeout(target)
+        started = time.perf_counter()
+        response = None
+        error = None
+        timed_out = False
         try:
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {
-                        "name": "FastAPI-Client",
-                        "version": "1.0.0"
-                    }
+            response = await asyncio.wait_for(self._rpc_stream(payload, headers, server_url, path), timeout)
+            return response
+        except asyncio.TimeoutError:
+            timed_out = True
+            error = f"Timeout adattivo di {timeout:.2f}s superato"
+            raise httpx.ReadTimeout(error)
+        except asyncio.CancelledError:
+            # Richiesta annullata dal chiamante: non è un esito del server
+            breaker.release()
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if response is not None:
+                # 4xx ed errori JSON-RPC indicano comunque un server vivo
+                alive = response.status_code < 500
+                breaker.record(alive)
+                self.latency.get(target).record(
+                    elapsed * 1000 if alive else None, ok=alive, error=None if alive else f"HTTP {response.status_code}"
+                )
+            elif timed_out:
+                breaker.record(False)
+                self.latency.get(target).record_timeout(timeout, error=error)
+            elif error is not None:
+                breaker.record(False)
+                self.latency.get(target).record(None, ok=False, error=error)
+            if isinstance(payload, list):
+                method = "batch"
+                ok = response is not None and response.status_code == 200 and len(response.messages) == len(payload)
+            else:
+                method = payload.get("method")
+                ok = response is not None and response.status_code == 200 and response.kind != "error"
+            metrics.observe_upstream(method, elapsed, ok)
+
+    async def _rpc_stream(self, payload, headers: dict, server_url: str, path: str) -> MCPResponse:
+        """POST di una richiesta (dict) o di un batch (lista); le risposte sono associate alle richieste per id"""
+        request_headers = {**self.headers, **(headers or {})}
+        batch = isinstance(payload, list)
+        request_ids = {p.get("id") for p in payload if "id" in p} if batch else {payload.get("id")}
+        server_url = server_url or self.mcp_url
+        url = f"{server_url}{path}"
+        messages = {}
+        passthrough = self.passthrough and not batch
+        sse_events = [] if passthrough else None
+
+        def collect(data) -> bool:
+            """Registra le risposte attese contenute in data; True quando sono arrivate tutte"""
+            for item in data if isinstance(data, list) else [data]:
+                if not isinstance(item, dict):
+                    continue
+                if "method" in item:
+                    # Notifica o richiesta del server: non è mai la risposta, anche se l'id coincide
+                    if "id" not in item:
+                        self._on_notification(server_url, item)
+                elif "id" in item and (item["id"] in request_ids or item["id"] is None):
+                    # id null: errore sull'intera richiesta (es. batch non supportato)
+                    messages[item["id"]] = item
+            return request_ids.issubset(messages)
+
+        def result(events: list = None) -> MCPResponse:
+            message = None if batch else messages.get(payload.get("id"), messages.get(None))
+            return MCPResponse(200, response.headers, events, message, messages=messages, sse_events=sse_events)
+
+        response = await self.transport.open("POST", url, json=payload, headers=request_headers)
+        chunks = None
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                return MCPResponse(response.status_code, response.headers, text=response.text)
+
+            # Alcuni server rispondono JSON semplice invece di SSE
+            if response.headers.get("content-type", "").startswith("application/json"):
+                await response.aread()
+                data = response.json()
+                collect(data)
+                return result([{"data": data}])
+
+            decoder = SSEDecoder()
+            events = None if passthrough else []
+            # Risposta trovata prima della fine dello stream: il resto del body lo legge transport.close()
+            chunks = response.aiter_bytes()
+            async for chunk in chunks:
+                for event in decoder.feed(chunk):
+                    if passthrough:
+                        sse_events.append(event)
+                        if match_rpc_id(event.data, payload["id"]):
+                            # Risposta trovata senza decodificarla: il JSON si legge solo se serve
+                            return MCPResponse(200, response.headers, raw=event.data, sse_events=sse_events)
+                        data = event.json()
+                    else:
+                        event = event.to_dict()
+                        events.append(event)
+                        data = event.get("data")
+                    if collect(data):
+                        # Risposte trovate: inutile attendere la fine dello stream
+                        return result(events)
+            chunks = None
+            for event in decoder.flush():
+                if passthrough:
+                    sse_events.append(event)
+                    collect(event.json())
+                else:
+                    event = event.to_dict()
+                    events.append(event)
+                    collect(event.get("data"))
+        finally:
+            await self.transport.close(response, chunks)
+
+        return result(events)
+
+    async def _close_session(self, session: MCPSession):
+        """DELETE della sessione sul server (best effort: errori ignorati, niente se il circuito è aperto)"""
+        url = f"{session.server_url}/mcp"
+        if self.breaker(session.server_url).state == OPEN:
+            return
+        try:
+            response = await self.transport.open("DELETE", url, headers=session.headers(), timeout=self.call_timeout(url))
+            await self.transport.close(response)
+        except Exception:
+            pass
+
+    def _on_notification(self, server_url: str, message: dict):
+        """Gestisce le notifiche del server ricevute durante una chiamata"""
+        if message.get("method") == "notifications/tools/list_changed":
+            self.tool_cache.invalidate(server_url)
+
+    async def _open_session(self, server_url: str) -> MCPSession:
+        """Esegue initialize e crea una nuova sessione (usato dal session manager)"""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": self.next_id(),
+            "method": "initialize",
+            "params": {
+                "protocolVersion": self.protocol_version,
+                "capabilities": {},
+                "clientInfo": {
+                    "name": "FastAPI-Client",
+                    "version": "1.0.0"
                 }
             }
-            
-            response = requests.post(
-                f"{self.mcp_url}/mcp",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                sse_events = self.parse_sse_response(response.text)
-                
-                # Cerca il risultato initialize e session ID
-                initialize_result = None
-                for event in sse_events:
-                    event_data = event.get('data', {})
-                    if event_data.get('id') == 1:
-                        initialize_result = event_data
-                        # Estrai session ID dalla risposta
-                        if 'result' in event_data:
-                            self.session_id = event_data['result'].get('sessionId')
-                        break
-                
-                if initialize_result:
-                    return {
-                        "status": "success",
-                        "protocol": "SSE",
-                        "initialize_result": initialize_result,
-                        "session_id": self.session_id,
-                        "all_events": sse_events
-                    }
+        }
+
+        response = await self._rpc(payload, server_url=server_url)
+        if response.status_code != 200 or response.kind != "result":
+            raise MCPSessionError(response)
+
+        # Session ID: header standard MCP oppure campo sessionId del risultato
+        session_id = response.headers.get("mcp-session-id") or response.message["result"].get("sessionId")
+        encoded = (response.raw, response.events_json()) if response.raw is not None else None
+        return MCPSession(server_url, session_id, response.message, response.events, encoded)
+
+    async def _session_rpc(self, payload: dict, server_url: str = None) -> MCPResponse:
+        """Chiamata JSON-RPC su una sessione del pool, re-inizializzata se il server la rifiuta.
+        Le chiamate idempotenti identiche condividono la stessa richiesta, qualunque sia la sessione;
+        le altre chiamate ravvicinate possono essere raggruppate in un batch dall'auto-batcher"""
+        server_url = server_url or self.mcp_url
+        method = payload.get("method")
+        if method in IDEMPOTENT_METHODS:
+            key = request_key(server_url, method, payload.get("params"), "session")
+            return await self.singleflight.do(key, lambda: self._session_call(payload, server_url))
+        return await self._session_call(payload, server_url)
+
+    async def _session_call(self, payload: dict, server_url: str) -> MCPResponse:
+        if self.batcher.enabled and server_url not in self.batch_unsupported:
+            return await self.batcher.submit(server_url, payload)
+        return await self._session_rpc_once(payload, server_url)
+
+    @staticmethod
+    def _with_session(payload: dict, session: MCPSession) -> dict:
+        if not session.session_id:
+            return payload
+        return {**payload, "params": {**payload.get("params", {}), "sessionId": session.session_id}}
+
+    async def _session_rpc_once(self, payload, server_url: str) -> MCPResponse:
+        """Richiesta (dict) o batch (lista) su una sessione del pool, ripetuta una volta se la sessione è rifiutata"""
+        for _ in range(2):
+            async with self.sessions.lease(server_url) as session:
+                if isinstance(payload, list):
+                    request = [self._with_session(p, session) for p in payload]
                 else:
-                    return {
-                        "status": "partial_success",
-                        "protocol": "SSE",
-                        "sse_events": sse_events,
-                        "message": "Initialize result not found"
-                    }
-            else:
-                return {
-                    "status": "error",
-                    "status_code": response.status_code,
-                    "message": response.text
-                }
-                
+                    request = self._with_session(payload, session)
+                response = await self._rpc(request, headers=session.headers(), server_url=server_url)
+                if not response.session_invalid:
+                    return response
+                session.invalidate()
+        return response
+
+    async def _session_batch(self, payloads: list, server_url: str = None) -> list:
+        """Invia più richieste in un solo POST e restituisce una MCPResponse per richiesta, nello stesso ordine.
+        Se il server rifiuta i batch ripiega su chiamate singole concorrenti e lo ricorda"""
+        server_url = server_url or self.mcp_url
+        if server_url not in self.batch_unsupported:
+            response = await self._session_rpc_once(payloads, server_url)
+            if not batch_rejected(response):
+                return [
+                    MCPResponse(
+                        response.status_code, response.headers, response.events,
+                        response.messages.get(p["id"]), response.text
+                    )
+                    for p in payloads
+                ]
+            self.batch_unsupported.add(server_url)
+        return list(await asyncio.gather(*(self._session_rpc_once(p, server_url) for p in payloads)))
+
+    async def batch(self, calls: list, server_url: str = None) -> list:
+        """Esegue più chiamate JSON-RPC in un'unica richiesta HTTP.
+        calls: lista di (method, params); restituisce le MCPResponse nello stesso ordine"""
+        payloads = [
+            {"jsonrpc": "2.0", "id": self.next_id(), "method": method, **({"params": params} if params else {})}
+            for method, params in calls
+        ]
+        return await self._session_batch(payloads, server_url)
+
+    def _session_error(self, error: MCPSessionError) -> dict:
+        response = error.response
+        if response.status_code != 200:
+            return {
+                "status": "error",
+                "status_code": response.status_code,
+                "message": response.text
+            }
+        return {
+            "status": "partial_success",
+            "protocol": "SSE",
+            "sse_events": response.events,
+            "message": str(error)
+        }
+
+    async def _ping(self, session: MCPSession) -> MCPResponse:
+        """ping sulla sessione: verifica che server e sessione rispondano ancora"""
+        payload = self._with_session({"jsonrpc": "2.0", "id": self.next_id(), "method": "ping"}, session)
+        return await self._rpc(payload, headers=session.headers(), server_url=session.server_url)
+
+    async def initialize_mcp(self, fresh: bool = False, encoder=None) -> dict:
+        """Inizializza la connessione MCP.
+        fresh=False riusa una sessione calda del pool, verificata con un ping prima di dichiarare il server online;
+        fresh=True esegue sempre initialize (nuova sessione, poi messa nel pool).
+        Con encoder, initialize_result e all_events sono restituiti già serializzati (bytes)"""
+        try:
+            verified_with = "initialize"
+            if not fresh:
+                session = await self.sessions.acquire(self.mcp_url)
+                try:
+                    if session.uses > 1:
+                        # La sessione in pool non dice nulla sullo stato attuale del server
+                        ping = await self._ping(session)
+                        if ping.session_invalid:
+                            session.invalidate()
+                            fresh = True
+                        elif ping.status_code != 200:
+                            return {
+                                "status": "error",
+                                "status_code": ping.status_code,
+                                "message": ping.text
+                            }
+                        else:
+                            verified_with = "ping"
+                finally:
+                    self.sessions.release(session)
+            if fresh:
+                session = await self._open_session(self.mcp_url)
+                session.uses = 1
+                self.sessions.release(session)
+            reused = session.uses > 1
+            initialize_result, events = (
+                session.encoded(encoder) if encoder else (session.initialize_result, session.events)
+            )
+
+            return {
+                "status": "success",
+                "protocol": "SSE",
+                "initialize_result": initialize_result,
+                "session_id": session.session_id,
+                "session_reused": reused,
+                "verified_with": verified_with,
+                "all_events": events
+            }
+
+        except MCPSessionError as e:
+            return self._session_error(e)
+        except CircuitOpenError as e:
+            return self._circuit_error(e)
         except Exception as e:
             return {
                 "status": "error",
                 "error": str(e)
             }
-    
-    async def list_tools(self) -> dict:
-        """Lista i tools disponibili sul server MCP con session ID"""
+
+    @staticmethod
+    def _catalog_result(entry, cached: bool, encoder=None) -> dict:
+        tools_data, events = entry.encoded(encoder) if encoder else (entry.tools_data, entry.events)
+        return {
+            "status": "success",
+            "tools_data": tools_data,
+            "events": events,
+            "etag": entry.etag,
+            "cached": cached
+        }
+
+    def _cache_catalog(self, response: MCPResponse):
+        """Salva il catalogo di una risposta tools/list; None se il server ha inviato JSON non valido"""
+        if response.raw is not None:
+            try:
+                # Passthrough: in cache vanno i byte ricevuti, validati una volta qui
+                return self.tool_cache.put_encoded(
+                    self.mcp_url, self.protocol_version, response.raw, response.events_json()
+                )
+            except ValueError:
+                # Niente inoltro diretto: si ripiega sul percorso decodificato
+                response.discard_raw()
+                return None
+        return self.tool_cache.put(self.mcp_url, self.protocol_version, response.message, response.events)
+
+    async def list_tools(self, use_cache: bool = True, encoder=None) -> dict:
+        """Lista i tools disponibili sul server MCP con session ID (catalogo in cache).
+        Con encoder, tools_data ed events del catalogo sono restituiti già serializzati (bytes)"""
+        if use_cache:
+            entry = self.tool_cache.get(self.mcp_url, self.protocol_version)
+            if entry is not None:
+                return self._catalog_result(entry, True, encoder)
+
         try:
             payload = {
                 "jsonrpc": "2.0",
-                "id": 2,
+                "id": self.next_id(),
                 "method": "tools/list"
             }
-            
-            # AGGIUNGI SESSION ID SE PRESENTE
-            if self.session_id:
-                payload["params"] = {"sessionId": self.session_id}
-            
-            response = requests.post(
-                f"{self.mcp_url}/mcp",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
-            
+
+            response = await self._session_rpc(payload)
+
             if response.status_code == 200:
-                sse_events = self.parse_sse_response(response.text)
-                tools_data = None
-                
-                for event in sse_events:
-                    if event.get('data', {}).get('id') == 2:
-                        tools_data = event.get('data', {})
-                        break
-                
+                if response.kind == "result":
+                    entry = self._cache_catalog(response)
+                    if entry is not None:
+                        return self._catalog_result(entry, False, encoder)
                 return {
                     "status": "success",
-                    "tools_data": tools_data,
-                    "events": sse_events
+                    "tools_data": response.message,
+                    "events": response.events,
+                    "etag": None,
+                    "cached": False
                 }
             else:
                 return {
@@ -142,30 +528,310 @@ class MCPClient:
                     "status_code": response.status_code,
                     "message": response.text
                 }
-                
+
+        except MCPSessionError as e:
+            return self._session_error(e)
+        except CircuitOpenError as e:
+            return self._circuit_error(e)
         except Exception as e:
             return {
                 "status": "error",
                 "error": str(e)
             }
 
-    # ... resto del codice invariato ...
-    
-    async def full_test(self) -> dict:
-        """Test completo del server MCP"""
-        test_results = {}
-        
-        # Test connessione
-        test_results["connection"] = await self.test_connection()
-        
-        # Test initialize
-        test_results["initialize"] = await self.initialize_mcp()
-        
-        # Test tools list (solo se initialize ha successo)
-        if test_results["initialize"]["status"] == "success":
-            test_results["tools_list"] = await self.list_tools()
-        
-        return test_results
+    async def call_tool(self, name: str, arguments: dict = None, deadline: float = None, server_url: str = None):
+        """Invoca un tool (tools/call) su una sessione del pool e produce gli eventi man mano che arrivano:
+        progress, notification, content (un elemento alla volta), result oppure error.
+        deadline: secondi massimi per l'intera chiamata"""
+        server_url = server_url or self.mcp_url
+        deadline = deadline or self.tool_call_deadline
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline
+        started = time.perf_counter()
+        request_id = self.next_id()
+        token = f"call-{request_id}"
+        payload = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "tools/call",
+            "params": {"name": name, "arguments": arguments or {}, "_meta": {"progressToken": token}}
+        }
+        state = {}
+        try:
+            for _ in range(2):
+                session = await asyncio.wait_for(self.sessions.acquire(server_url), max(0.0, expires - loop.time()))
+                state = {"started": started}
+                try:
+                    async for event in self._stream_tool_call(self._with_session(payload, session), session, server_url, token, expires, state):
+                        yield event
+                finally:
+                    if state.get("session_invalid"):
+                        session.invalidate()
+                    self.sessions.release(session)
+                if not state.get("session_invalid"):
+                    return
+            yield {"event": "error", "data": {"status": "error", "error": "Sessione MCP rifiutata dal server"}}
+        except CircuitOpenError as e:
+            yield {"event": "error", "data": self._circuit_error(e)}
+        except MCPSessionError as e:
+            yield {"event": "error", "data": self._session_error(e)}
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            yield {"event": "error", "data": {"status": "error", "error": f"Deadline di {deadline:g}s superata"}}
+        except httpx.HTTPError as e:
+            yield {"event": "error", "data": {"status": "error", "error": str(e) or type(e).__name__}}
+        finally:
+            metrics.observe_upstream("tools/call", time.perf_counter() - started, state.get("ok", False))
+
+    async def _stream_tool_call(self, payload: dict, session: MCPSession, server_url: str, token: str,
+                                expires: float, state: dict):
+        """Una tools/call in streaming: legge lo stream SSE a chunk senza accumulare gli eventi"""
+        loop = asyncio.get_running_loop()
+        breaker = self.breaker(server_url)
+        if not breaker.allow():
+            raise CircuitOpenError(server_url, breaker.retry_after())
+
+        def remaining() -> float:
+            left = expires - loop.time()
+            if left <= 0:
+                raise asyncio.TimeoutError()
+            return left
+
+        recorded = False
+        try:
+            left = remaining()
+            base = self.transport.timeout
+            timeout = httpx.Timeout(
+                connect=min(base.connect, left), read=left, write=min(base.write, left), pool=min(base.pool, left)
+            )
+            headers = {**self.headers, **session.headers()}
+            response = await self.transport.open("POST", f"{server_url}/mcp", json=payload, headers=headers, timeout=timeout)
+            chunks = None
+            try:
+                if response.status_code != 200:
+                    await asyncio.wait_for(response.aread(), remaining())
+                    breaker.record(response.status_code < 500)
+                    recorded = True
+                    if MCPResponse(response.status_code, text=response.text).session_invalid:
+                        state["session_invalid"] = True
+                        return
+                    yield {"event": "error", "data": {
+                        "status": "error", "status_code": response.status_code, "message": response.text
+                    }}
+                    return
+                # Server vivo: la durata del tool non riguarda il circuit breaker
+                breaker.record(True)
+                recorded = True
+
+                if response.headers.get("content-type", "").startswith("application/json"):
+                    # Risposta JSON semplice: va letta per intero prima di poterla decodificare
+                    await asyncio.wait_for(response.aread(), remaining())
+                    for event in self._tool_call_events(response.json(), payload["id"], token, server_url, state):
+                        yield event
+                    return
+
+                decoder = SSEDecoder()
+                chunks = response.aiter_bytes()
+                while not state.get("done"):
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        chunks = None
+                        break
+                    for sse_event in decoder.feed(chunk):
+                        for event in self._tool_call_events(sse_event.json(), payload["id"], token, server_url, state):
+                            yield event
+                if not state.get("done"):
+                    for sse_event in decoder.flush():
+                        for event in self._tool_call_events(sse_event.json(), payload["id"], token, server_url, state):
+                            yield event
+                if not state.get("done"):
+                    yield {"event": "error", "data": {"status": "error", "error": "Stream chiuso prima del risultato"}}
+            finally:
+                # Risultato arrivato prima della fine dello stream: il resto del body lo legge transport.close()
+                await self.transport.close(response, chunks)
+        except (asyncio.CancelledError, GeneratorExit):
+            # Chiamante disconnesso: non è un esito del server
+            if not recorded:
+                breaker.release()
+            raise
+        except Exception:
+            if not recorded:
+                breaker.record(False)
+            raise
+
+    def _tool_call_events(self, data, request_id: int, token: str, server_url: str, state: dict) -> list:
+        """Converte un messaggio JSON-RPC dello stream di tools/call negli eventi per il chiamante"""
+        events = []
+        for message in data if isinstance(data, list) else [data]:
+            if not isinstance(message, dict):
+                continue
+            if "method" in message and "id" not in message:
+                params = message.get("params") or {}
+                if message["method"] == "notifications/progress" and params.get("progressToken") == token:
+                    events.append({"event": "progress", "data": params})
+                else:
+                    self._on_notification(server_url, message)
+                    events.append({"event": "notification", "data": message})
+            elif "method" not in message and message.get("id") == request_id:
+                state["done"] = True
+                if "error" in message:
+                    events.append({"event": "error", "data": {"status": "error", "error": message["error"]}})
+                    continue
+                result = message.get("result") or {}
+                content = result.get("content") or []
+                # Un evento per elemento di contenuto: output grandi arrivano a pezzi al chiamante
+                events.extend({"event": "content", "data": {"index": i, **item}} for i, item in enumerate(content))
+                state["ok"] = not result.get("isError", False)
+                events.append({"event": "result", "data": {
+                    "status": "success",
+                    "isError": result.get("isError", False),
+                    "content_items": len(content),
+                    "duration_ms": round((time.perf_counter() - state["started"]) * 1000, 2),
+                    **{key: value for key, value in result.items() if key not in ("content", "isError")}
+                }})
+        return events
+
+    async def _bulk_item(self, index: int, call, timeout: float = None) -> dict:
+        """Esegue una tools/call della bulk e ne raccoglie gli eventi in un unico risultato"""
+        if not isinstance(call, dict) or not isinstance(call.get("name"), str):
+            return {"index": index, "status": "error", "error": "Ogni chiamata richiede un campo name"}
+        item = {"index": index, "id": call.get("id"), "name": call["name"]}
+        content = []
+        async with self.bulk_slots:
+            started = time.perf_counter()
+            async for event in self.call_tool(call["name"], call.get("arguments"), deadline=timeout):
+                data = event["data"]
+                if event["event"] == "content":
+                    content.append({key: value for key, value in data.items() if key != "index"})
+                elif event["event"] == "result":
+                    item.update(status="success", isError=data["isError"])
+                elif event["event"] == "error":
+                    item.update(status="error", error=data.get("error") or data.get("message"))
+        item.setdefault("status", "error")
+        item["content"] = content
+        item["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return item
+
+    async def call_tools(self, calls: list, concurrency: int = 8, timeout: float = None, ordered: bool = False):
+        """Esegue molte tools/call in parallelo (al massimo `concurrency` per volta, entro il limite globale)
+        e produce i risultati appena pronti, oppure nell'ordine di `calls` se ordered"""
+        results = asyncio.Queue()
+        pending_calls = iter(enumerate(calls))
+
+        async def worker():
+            for index, call in pending_calls:
+                try:
+                    item = await self._bulk_item(index, call, timeout)
+                except Exception as e:
+                    item = {"index": index, "status": "error", "error": str(e) or type(e).__name__}
+                results.put_nowait(item)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(calls)))]
+        try:
+            buffered = {}
+            next_index = 0
+            for _ in range(len(calls)):
+                item = await results.get()
+                if not ordered:
+                    yield item
+                    continue
+                # Risultati arrivati in anticipo restano in attesa di quelli precedenti
+                buffered[item["index"]] = item
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def test_connection(self) -> dict:
+        """Probe leggero di raggiungibilità (HEAD sulla connessione persistente)"""
+        stats = self.latency.get(self.mcp_url)
+        breaker = self.breaker(self.mcp_url)
+        if not breaker.allow():
+            return {**self._circuit_error(CircuitOpenError(self.mcp_url, breaker.retry_after())), "stats": stats.snapshot()}
+
+        timeout = self.call_timeout(self.mcp_url)
+        started = time.perf_counter()
+        try:
+            response = await self.transport.head(self.mcp_url, timeout=timeout)
+            latency_ms = (time.perf_counter() - started) * 1000
+            # Qualsiasi risposta sotto 500 indica un server vivo (404/405 sono normali)
+            breaker.record(response.status_code < 500)
+            if response.status_code < 500:
+                stats.record(latency_ms)
+                return {
+                    "status": "success",
+                    "status_code": response.status_code,
+                    "latency_ms": round(latency_ms, 2),
+                    "note": "404 è normale per MCP server",
+                    "stats": stats.snapshot()
+                }
+            stats.record(latency_ms, ok=False, error=f"HTTP {response.status_code}")
+            return {
+                "status": "error",
+                "status_code": response.status_code,
+                "latency_ms": round(latency_ms, 2),
+                "error": f"HTTP {response.status_code}",
+                "stats": stats.snapshot()
+            }
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            breaker.record(False)
+            if isinstance(e, httpx.TimeoutException):
+                stats.record_timeout(timeout, error=error)
+            else:
+                stats.record(None, ok=False, error=error)
+            return {
+                "status": "error",
+                "error": error,
+                "stats": stats.snapshot()
+            }
+
+
+    async def full_test(self, deadline: float = 15.0) -> dict:
+        """Test completo del server MCP: stage indipendenti in parallelo entro una deadline comune"""
+        return await run_stage_graph({
+            # Test connessione
+            "connection": (self.test_connection, []),
+            # Test initialize: sempre una initialize vera, non la sessione in pool
+            "initialize": (lambda: self.initialize_mcp(fresh=True), []),
+            # Test tools list (solo se initialize ha successo)
+            "tools_list": (lambda: self.list_tools(use_cache=False), ["initialize"])
+        }, deadline)
+
+    async def prewarm(self) -> dict:
+        """Apre connessione TLS e sessione MCP in anticipo (cold start): la prima richiesta le trova pronte"""
+        started = time.perf_counter()
+        try:
+            session = await self.sessions.acquire(self.mcp_url)
+            self.sessions.release(session)
+            status = "success"
+        except Exception as e:
+            status = f"error: {str(e) or type(e).__name__}"
+        return {"status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def circuit_snapshot(self) -> dict:
+        """Stato dei circuit breaker e timeout adattivi correnti, per i payload di health"""
+        return {
+            server_url: {**breaker.snapshot(), "timeout_s": round(self.call_timeout(f"{server_url}/mcp"), 3)}
+            for server_url, breaker in self.breakers.items()
+        }
+
+    async def aclose(self):
+        """Chiude le sessioni in pool sul server, poi le connessioni del trasporto"""
+        await self.sessions.aclose()
+        await self.transport.aclose()
 
 # Client globale per l'app
 mcp_client = MCPClient()
+
+# Stato di salute del server MCP, aggiornato in background
+health_prober = HealthProber(mcp_client)
+
+# Notifiche push dal server MCP (stream GET persistente)
+notification_listener = NotificationListener(mcp_client)
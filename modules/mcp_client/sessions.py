@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class MCPSessionError(Exception):
+    """Initialize fallito: contiene la risposta del server per il messaggio d'errore"""
+
+    def __init__(self, response, message: str = "Initialize result not found"):
+        super().__init__(message)
+        self.response = response
+
+
+class MCPSession:
+    """Sessione MCP inizializzata verso un server"""
+
+    def __init__(self, server_url: str, session_id: str = None, initialize_result: dict = None, events: list = None,
+                 encoded: tuple = None):
+        self.server_url = server_url
+        self.session_id = session_id
+        self.initialize_result = initialize_result
+        self.events = events or []
+        self._encoded = encoded  # (initialize_result, events) come ricevuti dal server (passthrough)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.invalid = False
+
+    def encoded(self, dumps) -> tuple:
+        """(initialize_result, events) serializzati una volta per sessione"""
+        if self._encoded is None:
+            self._encoded = (dumps(self.initialize_result), dumps(self.events))
+        return self._encoded
+
+    def headers(self) -> dict:
+        """Header da aggiungere alle richieste della sessione"""
+        return {"Mcp-Session-Id": self.session_id} if self.session_id else {}
+
+    def invalidate(self):
+        """Segna la sessione come non più valida: verrà scartata al rilascio"""
+        self.invalid = True
+
+
+class MCPSessionManager:
+    """Pool di sessioni MCP già inizializzate, indicizzate per URL del server"""
+
+    def __init__(self, initializer, closer=None, idle_timeout: float = 300.0, max_idle: int = 8):
+        # initializer: coroutine (server_url) -> MCPSession, solleva MCPSessionError
+        self.initializer = initializer
+        # closer: coroutine (MCPSession) che chiude la sessione sul server, best effort
+        self.closer = closer
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self._idle = {}
+        self._closing = set()
+        self.stats = {"created": 0, "reused": 0, "expired": 0, "invalidated": 0, "closed": 0}
+
+    def _discard(self, session: MCPSession):
+        """Sessione ancora valida che esce dal pool: chiusa sul server in background, altrimenti resterebbe aperta là"""
+        if self.closer is None or not session.session_id:
+            return
+        self.stats["closed"] += 1
+        task = asyncio.ensure_future(self.closer(session))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _is_expired(self, session: MCPSession, now: float) -> bool:
+        return now - session.last_used > self.idle_timeout
+
+    async def acquire(self, server_url: str) -> MCPSession:
+        """Restituisce una sessione calda se disponibile, altrimenti ne inizializza una nuova"""
+        idle = self._idle.get(server_url)
+        now = time.monotonic()
+        while idle:
+            session = idle.pop()  # LIFO: la più recente è la più calda
+            if self._is_expired(session, now):
+                self.stats["expired"] += 1
+                self._discard(session)
+                continue
+            session.uses += 1
+            self.stats["reused"] += 1
+            return session
+
+        session = await self.initializer(server_url)
+        session.uses = 1
+        self.stats["created"] += 1
+        return session
+
+    def release(self, session: MCPSession):
+        """Rimette la sessione nel pool (o la scarta se invalida)"""
+        if session.invalid:
+            self.stats["invalidated"] += 1
+            return
+        session.last_used = time.monotonic()
+        idle = self._idle.setdefault(session.server_url, deque())
+        # Initialize condivisi (single-flight): più chiamanti possono restituire la stessa sessione
+        if any(s is session or (session.session_id and s.session_id == session.session_id) for s in idle):
+            return
+        if len(idle) < self.max_idle:
+            idle.append(session)
+        else:
+            self._discard(session)
+
+    @asynccontextmanager
+    async def lease(self, server_url: str):
+        """Prende in prestito una sessione e la restituisce all'uscita"""
+        session = await self.acquire(server_url)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def clear(self, server_url: str = None):
+        """Svuota il pool (di un server o di tutti)"""
+        if server_url is None:
+            self._idle.clear()
+        else:
+            self._idle.pop(server_url, None)
+
+    async def aclose(self, timeout: float = 2.0):
+        """Chiude sul server tutte le sessioni in pool e attende le chiusure in corso (shutdown, al massimo timeout)"""
+        for idle in self._idle.values():
+            for session in idle:
+                self._discard(session)
+        self._idle.clear()
+        if self._closing:
+            _, pending = await asyncio.wait(set(self._closing), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        """Stato del pool per i payload di diagnostica"""
+        return {
+            "idle_sessions": {url: len(idle) for url, idle in self._idle.items()},
+            **self.stats
+        }
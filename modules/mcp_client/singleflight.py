@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+# Metodi JSON-RPC senza effetti collaterali: chiamate identiche concorrenti possono condividere la risposta
+IDEMPOTENT_METHODS = frozenset({"initialize", "ping", "tools/list"})
+
+
+def request_key(server_url: str, method: str, params: dict = None, *extra) -> tuple:
+    """Chiave di coalescing: server, metodo e params canonici (l'id JSON-RPC è escluso)"""
+    return (server_url, method, json.dumps(params or {}, sort_keys=True, separators=(",", ":")), *extra)
+
+
+class SingleFlight:
+    """Le chiamate concorrenti con la stessa chiave condividono un'unica esecuzione"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def _done(self, key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # evita "exception was never retrieved" se nessuno attende più
+
+    async def do(self, key, func):
+        """Esegue func() una sola volta per chiave; gli altri chiamanti attendono lo stesso risultato"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["shared"] += 1
+        # shield: se un chiamante viene annullato la chiamata prosegue per gli altri
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {"inflight": len(self._inflight), **self.stats}
@@ -0,0 +1,212 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fine riga SSE: CRLF, CR oppure LF
+_LINE_END = re.compile(rb"\r\n|\r|\n")
+_SCALAR = r'(?:-?\d+|"(?:[^"\\]|\\.)*"|null)'
+# id di primo livello in coda al messaggio (server che serializzano result prima di id)
+_TRAILING_ID = re.compile(r',\s*"id"\s*:\s*(' + _SCALAR + r')\s*}\s*$')
+# result/error come chiave (non come valore stringa, es. "level":"error")
+_BODY_KEY = re.compile(r'(?<!\\)"(?:result|error)"\s*:')
+# Intestazione di una risposta: solo jsonrpc e id prima di result/error (niente method né altre chiavi)
+_HEADER = re.compile(r'\s*\{(?:\s*"(?:jsonrpc|id)"\s*:\s*' + _SCALAR + r'\s*,)*\s*')
+_HEADER_ID = re.compile(r'"id"\s*:\s*(' + _SCALAR + r')')
+
+
+def _body_start(data: str) -> int:
+    """Posizione della prima chiave result/error: ciò che precede è l'intestazione del messaggio"""
+    match = _BODY_KEY.search(data)
+    return match.start() if match else len(data)
+
+
+def match_rpc_id(data: str, request_id) -> bool:
+    """True se data è certamente la risposta JSON-RPC con questo id, senza decodificare il JSON.
+    L'intestazione prima di result/error può contenere solo jsonrpc e id; l'id si cerca lì o in coda.
+    Nei casi ambigui (notifiche, richieste del server, chiavi inattese) restituisce False
+    e il chiamante ripiega sulla decodifica completa"""
+    start = _body_start(data)
+    if start == len(data) or not _HEADER.fullmatch(data, 0, start):
+        return False
+    expected = json.dumps(request_id)
+    header_id = _HEADER_ID.search(data, 0, start)
+    if header_id is not None:
+        return header_id.group(1) == expected
+    tail = _TRAILING_ID.search(data, max(0, len(data) - 256))
+    return tail is not None and tail.group(1) == expected
+
+
+def rpc_kind(data: str) -> str:
+    """'result' o 'error' in base alla prima chiave del corpo del messaggio, None se assente"""
+    start = _body_start(data)
+    if start == len(data):
+        return None
+    return "result" if data.startswith('"result"', start) else "error"
+
+
+def _valid_json(raw: bytes) -> bool:
+    """Validazione prima di inoltrare byte del server così come sono"""
+    try:
+        orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        return False
+    return True
+
+
+class SSEEvent:
+    """Singolo evento SSE completo"""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, event: str = None, data: str = "", id: str = None, retry: int = None):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def json(self):
+        """Decodifica il campo data come JSON (stringa grezza se non valido)"""
+        try:
+            return json.loads(self.data)
+        except (json.JSONDecodeError, TypeError):
+            return self.data
+
+    def to_raw(self) -> bytes:
+        """Come to_dict ma già serializzato: il campo data JSON è inserito così com'è, senza decodificarlo"""
+        parts = []
+        if self.event is not None:
+            parts.append(b'"event":' + json.dumps(self.event).encode("utf-8"))
+        if self.data:
+            raw = self.data.encode("utf-8")
+            if not (self.data.lstrip()[:1] in ("{", "[") and _valid_json(raw)):
+                # Come to_dict: data non JSON (o malformato) diventa una stringa
+                raw = json.dumps(self.data).encode("utf-8")
+            parts.append(b'"data":' + raw)
+        if self.id is not None:
+            parts.append(b'"id":' + json.dumps(self.id).encode("utf-8"))
+        if self.retry is not None:
+            parts.append(b'"retry":' + str(self.retry).encode("ascii"))
+        return b"{" + b",".join(parts) + b"}"
+
+    def to_dict(self) -> dict:
+        """Formato dizionario usato storicamente da parse_sse_response"""
+        event = {}
+        if self.event is not None:
+            event["event"] = self.event
+        if self.data:
+            event["data"] = self.json()
+        if self.id is not None:
+            event["id"] = self.id
+        if self.retry is not None:
+            event["retry"] = self.retry
+        return event
+
+
+class SSEDecoder:
+    """Decoder SSE incrementale: riceve chunk di bytes e restituisce gli eventi completi"""
+
+    def __init__(self):
+        # Frammenti della riga non ancora terminata: uniti solo quando arriva il fine riga
+        self._fragments = []
+        self._pending_cr = False
+        self._reset()
+        self.last_event_id = None
+        self.retry = None
+
+    def _reset(self):
+        self._event = None
+        self._data = []
+        self._id = None
+        self._retry = None
+
+    def feed(self, chunk: bytes) -> list:
+        """Aggiunge un chunk e restituisce gli eventi completati.
+        I fine riga si cercano solo nei byte nuovi: costo lineare anche con righe data: da più MB"""
+        # CRLF spezzato tra due chunk: il \n è già stato contato col \r precedente
+        if self._pending_cr and chunk.startswith(b"\n"):
+            chunk = chunk[1:]
+        self._pending_cr = False
+
+        events = []
+        pos = 0
+        for match in _LINE_END.finditer(chunk):
+            line = chunk[pos:match.start()]
+            if self._fragments:
+                self._fragments.append(line)
+                line = b"".join(self._fragments)
+                self._fragments = []
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+            pos = match.end()
+
+        if pos < len(chunk):
+            self._fragments.append(chunk[pos:])
+        elif chunk.endswith(b"\r"):
+            self._pending_cr = True
+        return events
+
+    def flush(self) -> list:
+        """Fine stream: restituisce l'eventuale evento non terminato da riga vuota"""
+        events = []
+        if self._fragments:
+            event = self._process_line(b"".join(self._fragments))
+            if event is not None:
+                events.append(event)
+            self._fragments = []
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes):
+        if not line:
+            return self._dispatch()
+        if line.startswith(b":"):
+            return None  # commento / keep-alive
+
+        field, sep, value = line.partition(b":")
+        if sep and value.startswith(b" "):
+            value = value[1:]
+        field = field.decode("utf-8", errors="replace")
+        value = value.decode("utf-8", errors="replace")
+
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            if "\0" not in value:
+                self._id = value
+        elif field == "retry":
+            if value.isdigit():
+                self._retry = int(value)
+        return None
+
+    def _dispatch(self):
+        if not self._data and self._event is None and self._id is None and self._retry is None:
+            return None
+        if self._id is not None:
+            self.last_event_id = self._id
+        if self._retry is not None:
+            self.retry = self._retry
+        event = SSEEvent(
+            event=self._event,
+            data="\n".join(self._data),
+            id=self._id,
+            retry=self._retry,
+        )
+        self._reset()
+        return event
+
+
+def parse_sse_text(response_text: str) -> list:
+    """Parsa una risposta SSE già completa in una lista di dizionari"""
+    decoder = SSEDecoder()
+    events = decoder.feed(response_text.encode("utf-8"))
+    events.extend(decoder.flush())
+    return [event.to_dict() for event in events]
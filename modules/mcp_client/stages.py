@@ -0,0 +1,44 @@
+import asyncio
+
+
+async def run_stage_graph(stages: dict, deadline: float) -> dict:
+    """Esegue stage con dipendenze: quelli indipendenti in parallelo, gli altri appena pronti.
+
+    stages: {nome: (coroutine_function, [dipendenze])}. Uno stage parte quando tutte le
+    dipendenze hanno status "success"; se una fallisce viene saltato e non compare nei
+    risultati. Ogni risultato riceve una chiave "timing" relativa all'avvio del grafo.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    end = started + deadline
+    tasks = {}
+
+    def elapsed_ms(t: float) -> float:
+        return round((t - started) * 1000, 2)
+
+    async def run(name: str, func, deps: list):
+        for dep in deps:
+            result = await tasks[dep]
+            if result is None or result.get("status") != "success":
+                return None
+
+        stage_start = loop.time()
+        try:
+            result = await asyncio.wait_for(func(), max(0.0, end - stage_start))
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"Deadline di {deadline}s superata"}
+        stage_end = loop.time()
+
+        result = dict(result)
+        result["timing"] = {
+            "start_ms": elapsed_ms(stage_start),
+            "end_ms": elapsed_ms(stage_end),
+            "duration_ms": round((stage_end - stage_start) * 1000, 2)
+        }
+        return result
+
+    for name, (func, deps) in stages.items():
+        tasks[name] = asyncio.ensure_future(run(name, func, deps))
+
+    results = await asyncio.gather(*tasks.values())
+    return {name: result for name, result in zip(tasks, results) if result is not None}
@@ -0,0 +1,80 @@
+from collections import deque
+
+
+def _pick(ordered: list, p: float):
+    """Percentile p (0-100) su una lista già ordinata, None se vuota"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class LatencyStats:
+    """Latenze recenti (finestra scorrevole) e contatori errori per un target"""
+
+    def __init__(self, window: int = 512):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+        self.errors = 0
+        self.last_error = None
+        self.consecutive_timeouts = 0
+
+    def record(self, latency_ms: float, ok: bool = True, error: str = None):
+        """Registra l'esito di una chiamata"""
+        self.total += 1
+        if ok:
+            self.consecutive_timeouts = 0
+        if latency_ms is not None:
+            self.samples.append(round(latency_ms, 2))
+        if not ok:
+            self.errors += 1
+            self.last_error = error
+
+    def record_timeout(self, timeout_s: float, error: str = None):
+        """Chiamata interrotta dal timeout: campione censurato al valore del timeout
+        (la latenza vera è almeno questa, così il p99 sale se il server rallenta)"""
+        self.record(timeout_s * 1000, ok=False, error=error)
+        self.consecutive_timeouts += 1
+
+    def percentile(self, p: float) -> float:
+        """Percentile p (0-100) sulla finestra corrente, None se vuota"""
+        return _pick(sorted(self.samples), p)
+
+    def adaptive_timeout(self, multiplier: float, minimum: float, maximum: float, min_samples: int = 20) -> float:
+        """Timeout in secondi pari a p99 × multiplier, limitato a [minimum, maximum].
+        Con pochi campioni usa maximum (nessuna stima affidabile);
+        ogni timeout consecutivo raddoppia il valore verso maximum"""
+        if len(self.samples) < min_samples:
+            return maximum
+        timeout = max(minimum, self.percentile(99) / 1000 * multiplier) * 2 ** min(self.consecutive_timeouts, 16)
+        return min(maximum, timeout)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.total, 4) if self.total else 0.0,
+            "p50_ms": _pick(ordered, 50),
+            "p95_ms": _pick(ordered, 95),
+            "p99_ms": _pick(ordered, 99),
+            "window": len(ordered),
+            "consecutive_timeouts": self.consecutive_timeouts,
+            "last_error": self.last_error
+        }
+
+
+class LatencyRegistry:
+    """Statistiche di latenza indicizzate per target (URL)"""
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._targets = {}
+
+    def get(self, target: str) -> LatencyStats:
+        stats = self._targets.get(target)
+        if stats is None:
+            stats = self._targets[target] = LatencyStats(self.window)
+        return stats
+
+    def snapshot(self) -> dict:
+        return {target: stats.snapshot() for target, stats in self._targets.items()}
@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+import httpx
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class MCPTransport:
+    """Trasporto HTTP asincrono condiviso verso i server MCP (keep-alive + pool)"""
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        write_timeout: float = None,
+        pool_timeout: float = None,
+        http_transport: httpx.AsyncBaseTransport = None,
+    ):
+        # Limiti del pool: configurabili da costruttore o variabili d'ambiente
+        self.limits = httpx.Limits(
+            max_connections=max_connections or _env_int("MCP_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=max_keepalive_connections or _env_int("MCP_MAX_KEEPALIVE", 20),
+            keepalive_expiry=keepalive_expiry or _env_float("MCP_KEEPALIVE_EXPIRY", 30.0),
+        )
+        # Timeout separati: connect breve, read più lungo per le risposte SSE
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout or _env_float("MCP_CONNECT_TIMEOUT", 3.0),
+            read=read_timeout or _env_float("MCP_READ_TIMEOUT", 10.0),
+            write=write_timeout or _env_float("MCP_WRITE_TIMEOUT", 5.0),
+            pool=pool_timeout or _env_float("MCP_POOL_TIMEOUT", 5.0),
+        )
+        # Trasporto httpx alternativo (es. httpx.ASGITransport verso un server MCP finto in-process)
+        self.http_transport = http_transport
+        # Body non letti fino in fondo: scartati entro questi limiti, poi la connessione torna nel pool.
+        # close() attende la fine del body al massimo drain_wait secondi, poi la lascia in background
+        self.drain_wait = _env_float("MCP_DRAIN_WAIT", 0.05)
+        self.drain_timeout = _env_float("MCP_DRAIN_TIMEOUT", 5.0)
+        self.drain_limit = _env_int("MCP_DRAIN_LIMIT", 1024 * 1024)
+        self._drains = set()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client creato alla prima richiesta, così ogni worker/event loop ha il suo"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.http_transport,
+            )
+        return self._client
+
+    def stream(self, method: str, url: str, json: dict = None, headers: dict = None, timeout=httpx.USE_CLIENT_DEFAULT):
+        """Richiesta in streaming: il body si legge a chunk dentro `async with`"""
+        return self.client.stream(method, url, json=json, headers=headers, timeout=timeout)
+
+    async def open(self, method: str, url: str, json=None, headers: dict = None, timeout=httpx.USE_CLIENT_DEFAULT) -> httpx.Response:
+        """Richiesta in streaming da chiudere con close(): permette di rispondere prima della fine del body"""
+        request = self.client.build_request(method, url, json=json, headers=headers, timeout=timeout)
+        return await self.client.send(request, stream=True)
+
+    async def close(self, response: httpx.Response, chunks=None):
+        """Chiude una risposta aperta con open() senza perdere la connessione.
+        chunks: iteratore del body se la lettura si è fermata a metà; il resto si scarta in un task
+        (chiudere un body non finito farebbe scartare la connessione keep-alive).
+        Di solito il body finisce subito dopo la risposta: attenderlo brevemente evita che la richiesta
+        successiva apra un'altra connessione mentre questa non è ancora tornata nel pool"""
+        if response.is_closed:
+            return
+        if chunks is None and response.is_stream_consumed:
+            await response.aclose()
+            return
+        task = asyncio.ensure_future(self._drain(response, chunks))
+        self._drains.add(task)
+        task.add_done_callback(self._drains.discard)
+        await asyncio.wait({task}, timeout=self.drain_wait)
+
+    async def _drain(self, response: httpx.Response, chunks):
+        async def read_rest():
+            read = 0
+            async for chunk in chunks or response.aiter_raw():
+                read += len(chunk)
+                if read > self.drain_limit:
+                    # Troppi byte da scartare: meglio una connessione nuova
+                    return
+        try:
+            await asyncio.wait_for(read_rest(), self.drain_timeout)
+        except Exception:
+            pass
+        finally:
+            await response.aclose()
+
+    async def head(self, url: str, headers: dict = None, timeout=httpx.USE_CLIENT_DEFAULT) -> httpx.Response:
+        """HEAD: probe economico, nessun body da leggere"""
+        return await self.client.head(url, headers=headers, timeout=timeout)
+
+    async def aclose(self):
+        """Chiude il pool di connessioni (da chiamare allo shutdown)"""
+        for task in list(self._drains):
+            task.cancel()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
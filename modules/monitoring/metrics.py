@@ -0,0 +1,340 @@
+"""Metriche del processo in formato testo Prometheus.
+
+Con più worker (gunicorn) ogni processo ha il suo registro: se METRICS_DIR è impostata
+(gunicorn.conf.py lo fa) ogni worker scrive periodicamente un suo snapshot nella directory
+e /metrics restituisce la somma di tutti i worker, compresi quelli già terminati
+(archiviati dal master in child_exit), così i contatori non tornano mai indietro.
+"""
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+
+# Bucket in secondi, allocati una volta sola
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """Istogramma a bucket fissi: observe() non alloca"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # ultimo slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def state(self) -> list:
+        return [self.counts, self.sum, self.count]
+
+    def merge(self, state: list):
+        counts, total, count = state
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+    def render(self, name: str, labels: str, lines: list):
+        cumulative = 0
+        prefix = f"{name}_bucket{{{labels}," if labels else f"{name}_bucket{{"
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+
+
+class RouteMetrics:
+    """Metriche di una route (metodo + template del path)"""
+
+    __slots__ = ("labels", "latency", "statuses")
+
+    def __init__(self, method: str, route: str):
+        self.labels = f'method="{method}",route="{route}"'
+        self.latency = Histogram(HTTP_BUCKETS)
+        self.statuses = {}
+
+
+class UpstreamMetrics:
+    """Metriche delle chiamate al server MCP per metodo JSON-RPC"""
+
+    __slots__ = ("labels", "latency", "errors")
+
+    def __init__(self, method: str):
+        self.labels = f'method="{method}"'
+        self.latency = Histogram(UPSTREAM_BUCKETS)
+        self.errors = 0
+
+
+ARCHIVE = "archive.json"
+
+
+def _read(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write(path: str, state: dict):
+    # Scrittura atomica: chi legge vede sempre uno snapshot completo
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump(state, file)
+    os.replace(tmp, path)
+
+
+class MetricsRegistry:
+    """Registro delle metriche del processo, esportate in formato testo Prometheus"""
+
+    def __init__(self, directory: str = None):
+        self.routes = {}
+        self.upstream = {}
+        self.in_flight = 0
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.loop_lag_last = 0.0
+        self.directory = directory  # snapshot dei worker da aggregare (None: processo singolo)
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(method, route)
+        return metrics
+
+    def observe_upstream(self, method: str, seconds: float, ok: bool):
+        metrics = self.upstream.get(method)
+        if metrics is None:
+            metrics = self.upstream[method] = UpstreamMetrics(method or "unknown")
+        metrics.latency.observe(seconds)
+        if not ok:
+            metrics.errors += 1
+
+    def observe_loop_lag(self, seconds: float):
+        self.loop_lag_last = seconds
+        self.loop_lag.observe(seconds)
+
+    def state(self) -> dict:
+        """Snapshot serializzabile del registro"""
+        return {
+            "routes": [
+                [method, route, metrics.latency.state(), metrics.statuses]
+                for (method, route), metrics in self.routes.items()
+            ],
+            "upstream": [
+                [method, metrics.latency.state(), metrics.errors] for method, metrics in self.upstream.items()
+            ],
+            "loop_lag": self.loop_lag.state(),
+            "in_flight": self.in_flight,
+            "loop_lag_last": self.loop_lag_last
+        }
+
+    def merge(self, state: dict, live: bool = True):
+        """Somma uno snapshot; i gauge contano solo per i worker vivi"""
+        for method, route, latency, statuses in state["routes"]:
+            metrics = self.route(method, route)
+            metrics.latency.merge(latency)
+            for status, count in statuses.items():
+                metrics.statuses[status] = metrics.statuses.get(status, 0) + count
+        for method, latency, errors in state["upstream"]:
+            metrics = self.upstream.get(method)
+            if metrics is None:
+                metrics = self.upstream[method] = UpstreamMetrics(method or "unknown")
+            metrics.latency.merge(latency)
+            metrics.errors += errors
+        self.loop_lag.merge(state["loop_lag"])
+        if live:
+            self.in_flight += state["in_flight"]
+            self.loop_lag_last = max(self.loop_lag_last, state["loop_lag_last"])
+
+    def flush(self):
+        """Scrive lo snapshot di questo worker in directory"""
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            _write(os.path.join(self.directory, f"{os.getpid()}.json"), self.state())
+
+    def collect(self) -> "MetricsRegistry":
+        """Registro con la somma di tutti i worker (questo processo se directory non è impostata)"""
+        if not self.directory:
+            return self
+        self.flush()
+        states = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name != ARCHIVE:
+                state = _read(os.path.join(self.directory, name))
+                if state is not None:
+                    states[int(name[:-5])] = state
+        # Archivio letto per ultimo: un worker archiviato nel frattempo conta una volta sola
+        archive = _read(os.path.join(self.directory, ARCHIVE)) or {}
+        archived = set(archive.get("pids", []))
+        total = MetricsRegistry()
+        for pid, state in states.items():
+            if pid not in archived:
+                total.merge(state)
+        if "state" in archive:
+            total.merge(archive["state"], live=False)
+        return total
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Richieste HTTP in corso",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Latenza delle richieste HTTP per route",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        routes = list(self.routes.values())
+        for metrics in routes:
+            metrics.latency.render("http_request_duration_seconds", metrics.labels, lines)
+
+        lines += ["# HELP http_requests_total Richieste HTTP per route e status code", "# TYPE http_requests_total counter"]
+        for metrics in routes:
+            for status, count in metrics.statuses.items():
+                lines.append(f'http_requests_total{{{metrics.labels},status="{status}"}} {count}')
+
+        lines += [
+            "# HELP mcp_upstream_duration_seconds Latenza delle chiamate al server MCP per metodo JSON-RPC",
+            "# TYPE mcp_upstream_duration_seconds histogram",
+        ]
+        upstream = list(self.upstream.values())
+        for metrics in upstream:
+            metrics.latency.render("mcp_upstream_duration_seconds", metrics.labels, lines)
+        lines += ["# HELP mcp_upstream_errors_total Chiamate al server MCP fallite", "# TYPE mcp_upstream_errors_total counter"]
+        for metrics in upstream:
+            lines.append(f"mcp_upstream_errors_total{{{metrics.labels}}} {metrics.errors}")
+
+        lines += ["# HELP event_loop_lag_seconds Ritardo dell'event loop", "# TYPE event_loop_lag_seconds histogram"]
+        self.loop_lag.render("event_loop_lag_seconds", "", lines)
+        lines += [
+            "# HELP event_loop_lag_last_seconds Ultimo ritardo misurato dell'event loop",
+            "# TYPE event_loop_lag_last_seconds gauge",
+            f"event_loop_lag_last_seconds {self.loop_lag_last}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def archive_worker(directory: str, pid: int):
+    """Sposta lo snapshot di un worker terminato nell'archivio (chiamata dal master gunicorn).
+    L'archivio elenca i pid già inclusi: chi legge ignora i loro file anche prima della rimozione"""
+    path = os.path.join(directory, f"{pid}.json")
+    state = _read(path)
+    archive = _read(os.path.join(directory, ARCHIVE)) or {"pids": []}
+    if state is not None:
+        total = MetricsRegistry()
+        if "state" in archive:
+            total.merge(archive["state"], live=False)
+        total.merge(state, live=False)
+        archive["state"] = total.state()
+    # Restano solo i pid il cui file esiste ancora
+    pids = [p for p in archive["pids"] if os.path.exists(os.path.join(directory, f"{p}.json"))]
+    archive["pids"] = pids + [pid]
+    _write(os.path.join(directory, ARCHIVE), archive)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+metrics = MetricsRegistry(os.getenv("METRICS_DIR") or None)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latenza, status code e richieste in corso per route"""
+
+    def __init__(self, app, registry: MetricsRegistry = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        registry = self.registry
+        status = 500
+        registry.in_flight += 1
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_flight -= 1
+            # Template della route (es. /mcp/tools/{name}/call), non il path: cardinalità limitata
+            route = scope.get("route")
+            route_metrics = registry.route(scope["method"], getattr(route, "path", "<unmatched>"))
+            route_metrics.latency.observe(time.perf_counter() - started)
+            route_metrics.statuses[status] = route_metrics.statuses.get(status, 0) + 1
+
+
+class LoopLagMonitor:
+    """Misura periodicamente il ritardo dell'event loop"""
+
+    def __init__(self, registry: MetricsRegistry = None, interval: float = 0.5):
+        self.registry = registry or metrics
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.registry.observe_loop_lag(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class MetricsFlusher:
+    """Scrive periodicamente lo snapshot del worker in METRICS_DIR (solo con più worker)"""
+
+    def __init__(self, registry: MetricsRegistry = None, interval: float = None):
+        self.registry = registry or metrics
+        self.interval = interval or float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.registry.flush()
+
+    def start(self):
+        if self.registry.directory and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Ultimo snapshot prima dell'uscita del worker
+        self.registry.flush()
@@ -0,0 +1,134 @@
+"""Tempi di avvio dell'app (import, lifespan, pre-warm, prima richiesta).
+
+Uso da riga di comando:
+    python -m modules.monitoring.startup            # report degli import più lenti di main
+    python -m modules.monitoring.startup --ttfb     # avvia uvicorn e misura il time-to-first-byte
+"""
+import os
+import time
+
+_T0 = time.perf_counter()
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _process_age_ms():
+    """Età del processo (ms) letta da /proc: include l'avvio dell'interprete prima di questo import"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    """Traguardi dell'avvio in ms dall'import di questo modulo"""
+
+    def __init__(self):
+        self.interpreter_ms = _process_age_ms()
+        self.marks = {}
+        self.details = {}
+
+    def mark(self, name: str, **details):
+        """Registra un traguardo (solo la prima volta)"""
+        if name not in self.marks:
+            self.marks[name] = round((time.perf_counter() - _T0) * 1000, 2)
+            if details:
+                self.details[name] = details
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "interpreter_before_app_ms": self.interpreter_ms,
+            "milestones_ms": dict(self.marks),
+            "details": dict(self.details)
+        }
+
+
+startup_report = StartupReport()
+
+
+class FirstRequestTimer:
+    """Middleware ASGI: registra quando termina la prima richiesta HTTP servita"""
+
+    def __init__(self, app):
+        self.app = app
+        self.done = False
+
+    async def __call__(self, scope, receive, send):
+        if self.done or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.done = True
+            startup_report.mark("first_request", path=scope.get("path"))
+
+
+def _import_report(top: int):
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, cwd=_ROOT
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    total = next((c for c, _, name in rows if name.strip() == "main"), None)
+    print(f"import main: {total / 1000:.1f} ms" if total else "import main: n/d")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+def _ttfb_report(port: int, path: str):
+    import subprocess
+    import sys
+    import urllib.request
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=_ROOT
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    response.read(1)
+                break
+            except OSError:
+                if server.poll() is not None or time.perf_counter() - started > 30:
+                    print("server non avviato")
+                    return
+                time.sleep(0.01)
+        print(f"time-to-first-byte {path}: {(time.perf_counter() - started) * 1000:.1f} ms")
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/system/startup", timeout=5) as response:
+            print(response.read().decode())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report dei tempi di avvio")
+    parser.add_argument("--top", type=int, default=20, help="numero di moduli da mostrare")
+    parser.add_argument("--ttfb", action="store_true", help="avvia uvicorn e misura il time-to-first-byte")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/welcome")
+    args = parser.parse_args()
+
+    if args.ttfb:
+        _ttfb_report(args.port, args.path)
+    else:
+        _import_report(args.top)
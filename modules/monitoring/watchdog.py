@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+
+class LoopWatchdog:
+    """Rileva blocchi dell'event loop: un thread separato controlla un heartbeat e,
+    se il loop resta fermo oltre la soglia, salva stack, route e durata in un ring buffer"""
+
+    def __init__(self, threshold_ms: float = None, capacity: int = 100):
+        self.threshold = (threshold_ms or float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", "100"))) / 1000
+        self.interval = self.threshold / 4
+        self.stalls = deque(maxlen=capacity)
+        self.enabled = False
+        # Richieste in corso: task asyncio -> "METODO path" (popolato dal middleware)
+        self.active = {}
+        self._beat = 0.0
+        self._loop = None
+        self._loop_thread_id = None
+        self._heartbeat = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    async def _heartbeat_loop(self):
+        while True:
+            self._beat = time.perf_counter()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        current = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            gap = time.perf_counter() - beat
+            if gap <= self.threshold + self.interval:
+                current = None
+                continue
+            if current is not None and current["_beat"] == beat:
+                # Stesso blocco ancora in corso: aggiorna solo la durata
+                current["duration_ms"] = round(gap * 1000, 1)
+                continue
+            current = self._capture(beat, gap)
+            self.stalls.append(current)
+
+    def _capture(self, beat: float, gap: float) -> dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = [
+            f"{entry.filename}:{entry.lineno} in {entry.name}"
+            for entry in traceback.extract_stack(frame, limit=40)
+        ] if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        return {
+            "_beat": beat,
+            "detected_at": datetime.now().isoformat(),
+            "duration_ms": round(gap * 1000, 1),
+            "route": self.active.get(task),
+            "task": task.get_name() if task is not None else None,
+            "stack": stack
+        }
+
+    def start(self):
+        """Avvia heartbeat (nel loop corrente) e thread di controllo"""
+        if self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self.enabled = True
+
+    async def stop(self):
+        if not self.enabled:
+            return
+        self._stop.set()
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self.enabled = False
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": [
+                {key: value for key, value in stall.items() if not key.startswith("_")}
+                for stall in reversed(self.stalls)
+            ]
+        }
+
+
+watchdog = LoopWatchdog()
+
+
+class WatchdogMiddleware:
+    """Middleware ASGI: associa il task della richiesta alla route, per attribuire i blocchi"""
+
+    def __init__(self, app, loop_watchdog: LoopWatchdog = None):
+        self.app = app
+        self.watchdog = loop_watchdog or watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.watchdog.enabled:
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        self.watchdog.active[task] = f"{scope['method']} {scope['path']}"
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.active.pop(task, None)
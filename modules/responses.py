@@ -0,0 +1,181 @@
+"""Serializzazione JSON veloce per le risposte dell'app.
+
+- FastJSONResponse: default_response_class dell'app (orjson se installato, altrimenti json)
+- FastJSONRoute: le route senza response_model restituiscono direttamente FastJSONResponse,
+  saltando jsonable_encoder (usato solo se il payload non è già serializzabile)
+- RawJSON / raw_object / RawJSONResponse: JSON già codificato (es. catalogo MCP) inoltrato senza ri-serializzarlo
+- StaticPayload: risposte costanti codificate una volta, con ETag, Cache-Control e 304
+  (e varianti compresse calcolate una volta per codifica)
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+from datetime import datetime
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+from modules import compression
+from modules.mcp_client.cache import etag_matches
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(content) -> bytes:
+    """JSON compatto in bytes; jsonable_encoder solo per tipi non nativi (modelli, set, ...)"""
+    try:
+        return _dumps(content)
+    except TypeError:
+        return _dumps(jsonable_encoder(content))
+
+
+class RawJSON:
+    """Frammento JSON già codificato, da inserire così com'è in raw_object"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def raw_object(fields: dict) -> bytes:
+    """Oggetto JSON da campi Python e frammenti RawJSON, senza ri-serializzare questi ultimi"""
+    return b"{" + b",".join(
+        _dumps(key) + b":" + (value.data if isinstance(value, RawJSON) else dumps(value))
+        for key, value in fields.items()
+    ) + b"}"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con serializzatore veloce"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Body JSON già codificato (bytes), inviato senza alcuna serializzazione"""
+
+    media_type = "application/json"
+
+
+class StaticPayload:
+    """Payload costante serializzato una sola volta.
+    Con timestamp=True il campo "timestamp" viene inserito per richiesta nei byte già pronti
+    (ETag debole: cambia solo l'istante); con timestamp=False il body è identico a ogni risposta"""
+
+    _MARKER = "\x00timestamp\x00"
+
+    def __init__(self, content: dict, max_age: int = 60, timestamp: bool = False):
+        if timestamp:
+            # Se content ha già la chiave "timestamp", il campo resta in quella posizione
+            content = {**content, "timestamp": self._MARKER}
+        body = dumps(content)
+        if timestamp:
+            # Body diviso attorno al segnaposto: il timestamp si inserisce senza ri-serializzare
+            self._head, self._tail = body.split(_dumps(self._MARKER), 1)
+            digest_source = self._head + self._tail
+        else:
+            self._head, self._tail = body, None
+            digest_source = body
+        digest = hashlib.sha256(digest_source).hexdigest()[:32]
+        self.etag = f'W/"{digest}"' if timestamp else f'"{digest}"'
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+        # Varianti compresse (codifica -> body) solo per body costanti e sopra la soglia
+        self._variants = {} if self._tail is None and len(body) >= compression.MINIMUM_SIZE else None
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if self._variants is not None:
+            headers["Vary"] = "Accept-Encoding"
+        return headers
+
+    def body(self) -> bytes:
+        if self._tail is None:
+            return self._head
+        return self._head + _dumps(datetime.now().isoformat()) + self._tail
+
+    def response(self, request=None) -> Response:
+        """304 se If-None-Match corrisponde, altrimenti i byte pronti"""
+        if request is not None and etag_matches(request.headers.get("if-none-match"), self.etag.removeprefix("W/")):
+            return Response(status_code=304, headers=self.headers)
+        if self._variants is not None and request is not None:
+            encoding = compression.choose_encoding(request.headers.get("accept-encoding"))
+            if encoding is not None:
+                return RawJSONResponse(self._variant(encoding), headers={
+                    **self.headers,
+                    "ETag": "W/" + self.etag,
+                    "Content-Encoding": encoding
+                })
+        return RawJSONResponse(self.body(), headers=self.headers)
+
+    def _variant(self, encoding: str) -> bytes:
+        # Body costante: compresso una volta per codifica, al livello massimo
+        body = self._variants.get(encoding)
+        if body is None:
+            body = self._variants[encoding] = compression.compress_bytes(
+                encoding, self._head, compression.STATIC_LEVELS[encoding]
+            )
+            compression.stats["static_variants"] += 1
+        return body
+
+
+def _takes_response(endpoint) -> bool:
+    # Header/cookie impostati su un parametro Response vanno uniti da FastAPI: quelle route non si toccano
+    return any(
+        inspect.isclass(param.annotation) and issubclass(param.annotation, Response)
+        for param in inspect.signature(endpoint).parameters.values()
+    )
+
+
+def _fast_endpoint(endpoint, status_code: int):
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            content = await endpoint(*args, **kwargs)
+            return content if isinstance(content, Response) else FastJSONResponse(content, status_code=status_code)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            content = endpoint(*args, **kwargs)
+            return content if isinstance(content, Response) else FastJSONResponse(content, status_code=status_code)
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """Route che serializza i dict restituiti direttamente, senza passare da jsonable_encoder"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if self._can_skip_encoder(endpoint, kwargs):
+            endpoint = _fast_endpoint(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _can_skip_encoder(endpoint, kwargs: dict) -> bool:
+        # Solo route senza response_model (esplicito o dedotto dal tipo di ritorno) e con risposta JSON
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = response_model.value
+        response_class = kwargs.get("response_class")
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        return (
+            response_model is None
+            and inspect.signature(endpoint).return_annotation is inspect.Signature.empty
+            and (response_class is None or issubclass(response_class, JSONResponse))
+            and not _takes_response(endpoint)
+        )
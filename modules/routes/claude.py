@@ -1,21 +1,30 @@
-from fastapi import APIRouter
-import requests
-import json
+from fastapi import APIRouter, Query
+import asyncio
+import httpx
 import time
 from datetime import datetime
+from modules.mcp_client.breaker import CircuitOpenError
+from modules.mcp_client.mcp_client import mcp_client
+from modules.responses import FastJSONRoute
 
-router = APIRouter(prefix="/test", tags=["Claude Test"])
+router = APIRouter(prefix="/test", tags=["Claude Test"], route_class=FastJSONRoute)
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
 
 @router.get("/test-claude")
-async def test_claude_configuration():
+async def test_claude_configuration(
+    pacing_ms: int = Query(0, ge=0, le=5000, description="Pausa non bloccante tra initialize e tools/list")
+):
     """Testa il server MCP come farebbe Claude Desktop"""
     
-    MCP_URL = "https://test-mcp-prodv1.fly.dev/sse"
+    MCP_URL = f"{mcp_client.mcp_url}/sse"
     
     test_results = {
         "timestamp": datetime.now().isoformat(),
         "mcp_server_url": MCP_URL,
-        "tests": {}
+        "tests": {},
+        "timing": {}
     }
     
     # 1. Initialize (come fa Claude)
@@ -38,82 +47,81 @@ async def test_claude_configuration():
         }
     }
     
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json, text/event-stream"
-    }
-    
+    total_started = time.perf_counter()
     try:
-        # Initialize request
-        response = requests.post(MCP_URL, json=initialize_payload, headers=headers, timeout=10)
+        # Initialize request (stesso pool keep-alive del client MCP condiviso)
+        started = time.perf_counter()
+        response = await mcp_client._rpc(initialize_payload, path="/sse")
+        test_results["timing"]["initialize_ms"] = _elapsed_ms(started)
+        session_id = None
         
         if response.status_code == 200:
-            # Parse SSE response
-            initialize_data = None
-            server_info = None
-            lines = response.text.strip().split('\n')
-            
-            for line in lines:
-                if line.startswith('data:'):
-                    data = json.loads(line[5:])
-                    initialize_data = data
-                    
-                    # Extract server info
-                    server_info = data.get('result', {}).get('serverInfo', {})
-                    # Try to extract sessionId if present (needed for subsequent calls)
-                    session_id = data.get('result', {}).get('sessionId')
-                    break
+            # Risposta initialize (o primo messaggio JSON se l'id non corrisponde)
+            initialize_data = response.message or next(
+                (e["data"] for e in response.events if isinstance(e.get("data"), dict)), None
+            )
+            result = (initialize_data or {}).get('result', {})
+            # Extract server info
+            server_info = result.get('serverInfo', {})
+            # Session id: header MCP oppure campo sessionId (necessario per le chiamate successive)
+            session_id = response.headers.get('mcp-session-id') or result.get('sessionId')
             
             test_results["tests"]["initialize"] = {
                 "status": "success",
                 "status_code": response.status_code,
+                "latency_ms": test_results["timing"]["initialize_ms"],
                 "server_info": server_info,
                 "initialize_data": initialize_data,
-                "session_id": session_id if 'session_id' in locals() else None
+                "session_id": session_id
             }
         else:
             test_results["tests"]["initialize"] = {
                 "status": "error",
                 "status_code": response.status_code,
+                "latency_ms": test_results["timing"]["initialize_ms"],
                 "response_text": response.text
             }
         
         # 2. List tools (come farebbe Claude dopo initialize)
-        time.sleep(0.5)  # Breve pausa tra le richieste
+        if pacing_ms:
+            # Pausa opzionale tra le richieste, senza bloccare l'event loop
+            await asyncio.sleep(pacing_ms / 1000)
+            test_results["timing"]["pacing_ms"] = pacing_ms
         
         tools_payload = {
             "jsonrpc": "2.0",
             "id": 2,
             "method": "tools/list"
         }
+        session_headers = {}
         # If we extracted a session id from initialize, include it in params
-        if 'session_id' in locals() and session_id:
+        if session_id:
             tools_payload["params"] = {"sessionId": session_id}
+            session_headers["Mcp-Session-Id"] = session_id
         
-        tools_response = requests.post(MCP_URL, json=tools_payload, headers=headers, timeout=10)
+        # Diagnostica: sempre una tools/list vera su /sse, senza toccare la cache del catalogo di /mcp
+        started = time.perf_counter()
+        tools_response = await mcp_client._rpc(tools_payload, headers=session_headers, path="/sse")
+        test_results["timing"]["tools_list_ms"] = _elapsed_ms(started)
         
         if tools_response.status_code == 200:
-            tools_data = None
-            available_tools = []
-            lines = tools_response.text.strip().split('\n')
-            
-            for line in lines:
-                if line.startswith('data:'):
-                    tools_data = json.loads(line[5:])
-                    tools = tools_data.get('result', {}).get('tools', [])
-                    available_tools = [
-                        {
-                            "name": tool.get('name'),
-                            "description": tool.get('description'),
-                            "inputSchema": tool.get('inputSchema', {})
-                        }
-                        for tool in tools
-                    ]
-                    break
+            tools_data = tools_response.message or next(
+                (e["data"] for e in tools_response.events if isinstance(e.get("data"), dict)), None
+            )
+            tools = (tools_data or {}).get('result', {}).get('tools', [])
+            available_tools = [
+                {
+                    "name": tool.get('name'),
+                    "description": tool.get('description'),
+                    "inputSchema": tool.get('inputSchema', {})
+                }
+                for tool in tools
+            ]
             
             test_results["tests"]["tools_list"] = {
                 "status": "success",
                 "status_code": tools_response.status_code,
+                "latency_ms": test_results["timing"]["tools_list_ms"],
                 "tools_count": len(available_tools),
                 "tools": available_tools,
                 "tools_data": tools_data
@@ -122,9 +130,12 @@ async def test_claude_configuration():
             test_results["tests"]["tools_list"] = {
                 "status": "error",
                 "status_code": tools_response.status_code,
+                "latency_ms": test_results["timing"]["tools_list_ms"],
                 "response_text": tools_response.text
             }
         
+        test_results["timing"]["total_ms"] = _elapsed_ms(total_started)
+        
         # Calcola riepilogo
         total_tests = len(test_results["tests"])
         successful_tests = sum(1 for test in test_results["tests"].values() if test["status"] == "success")
@@ -153,14 +164,22 @@ async def test_claude_configuration():
         
         return test_results
         
-    except requests.exceptions.Timeout:
+    except CircuitOpenError as e:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "status": "error",
+            "error": str(e),
+            "circuit": "open",
+            "mcp_server_url": MCP_URL
+        }
+    except httpx.TimeoutException:
         return {
             "timestamp": datetime.now().isoformat(),
             "status": "error",
             "error": "Timeout nella connessione al server MCP",
             "mcp_server_url": MCP_URL
         }
-    except requests.exceptions.ConnectionError:
+    except httpx.TransportError:
         return {
             "timestamp": datetime.now().isoformat(),
             "status": "error", 
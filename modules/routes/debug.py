@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from modules import compression
+from modules.mcp_client.mcp_client import mcp_client
+from modules.monitoring.watchdog import watchdog
+from modules.responses import FastJSONRoute
+
+router = APIRouter(prefix="/debug", tags=["Debug"], route_class=FastJSONRoute)
+
+@router.get("/loop-stalls")
+async def loop_stalls():
+    """Blocchi dell'event loop rilevati dal watchdog (attivo con LOOP_WATCHDOG=1)"""
+    return watchdog.snapshot()
+
+@router.get("/counters")
+async def counters():
+    """Contatori diagnostici del worker: latenze MCP, single-flight, batching, sessioni e compressione"""
+    return {
+        "mcp_latency": mcp_client.latency.snapshot(),
+        "mcp_coalescing": mcp_client.singleflight.snapshot(),
+        "mcp_batching": {**mcp_client.batcher.snapshot(), "unsupported": sorted(mcp_client.batch_unsupported)},
+        "mcp_sessions": mcp_client.sessions.snapshot(),
+        "compression": compression.snapshot()
+    }
@@ -1,23 +1,49 @@
-from fastapi import APIRouter
-from modules.mcp_client.mcp_client import mcp_client
+import asyncio
+import math
+import os
+import time
+from fastapi import APIRouter, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from modules.mcp_client.cache import etag_matches
+from modules.mcp_client.mcp_client import mcp_client, notification_listener
+from modules.responses import FastJSONResponse, FastJSONRoute, RawJSON, RawJSONResponse, dumps, raw_object
 
-router = APIRouter(prefix="/mcp", tags=["MCP Server"])
+router = APIRouter(prefix="/mcp", tags=["MCP Server"], route_class=FastJSONRoute)
+
+# Numero massimo di chiamate accettate da /mcp/tools/bulk
+BULK_MAX_CALLS = int(os.getenv("MCP_BULK_MAX_CALLS", "1000"))
+
+def _upstream_error(result: dict, default_message: str, **fields) -> FastJSONResponse:
+    """Errore del client MCP inoltrato con motivo e stato del circuito; 503 + Retry-After se il circuito è aperto"""
+    payload = {
+        "status": "error",
+        **fields,
+        "message": result.get("message") or result.get("error") or default_message
+    }
+    for key in ("error", "status_code", "circuit", "retry_after_s"):
+        if key in result:
+            payload[key] = result[key]
+    if result.get("circuit") == "open":
+        retry_after = str(max(1, math.ceil(result["retry_after_s"])))
+        return FastJSONResponse(payload, status_code=503, headers={"Retry-After": retry_after})
+    return FastJSONResponse(payload)
 
 @router.get("/test")
 async def test_mcp_connection():
     """Testa la connessione al server MCP esterno"""
     try:
-        result = await mcp_client.initialize_mcp()
+        # Risultato e eventi di initialize arrivano già serializzati (una volta per sessione)
+        result = await mcp_client.initialize_mcp(encoder=dumps)
         
         if result["status"] == "success":
-            return {
+            return RawJSONResponse(raw_object({
                 "status": "success",
                 "mcp_server_status": "online",
                 "protocol": result["protocol"],
-                "initialize_result": result["initialize_result"],
-                "all_events": result["all_events"],
+                "initialize_result": RawJSON(result["initialize_result"]),
+                "all_events": RawJSON(result["all_events"]),
                 "message": "MCP Server funzionante con protocollo SSE!"
-            }
+            }))
         elif result["status"] == "partial_success":
             return {
                 "status": "partial_success",
@@ -27,11 +53,7 @@ async def test_mcp_connection():
                 "message": result.get("message", "MCP Server online ma risultato initialize non trovato")
             }
         else:
-            return {
-                "status": "error",
-                "mcp_server_status": "error",
-                "message": result.get("message", "Errore durante il test MCP")
-            }
+            return _upstream_error(result, "Errore durante il test MCP", mcp_server_status="error")
             
     except Exception as e:
         return {
@@ -41,26 +63,86 @@ async def test_mcp_connection():
         }
 
 @router.get("/tools")
-async def list_mcp_tools():
-    """Lista i tools disponibili sul server MCP"""
-    result = await mcp_client.list_tools()
+async def list_mcp_tools(request: Request, refresh: bool = False):
+    """Lista i tools disponibili sul server MCP (supporta If-None-Match → 304)"""
+    # Catalogo già serializzato (o byte del server in passthrough): nessuna ri-codifica per richiesta
+    result = await mcp_client.list_tools(use_cache=not refresh, encoder=dumps)
     
     if result["status"] == "success":
-        return {
+        etag = result["etag"]
+        headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if etag:
+            return RawJSONResponse(raw_object({
+                "status": "success",
+                "tools": RawJSON(result["tools_data"]),
+                "events": RawJSON(result["events"]),
+                "etag": etag,
+                "cached": result["cached"]
+            }), headers=headers)
+        return FastJSONResponse({
             "status": "success",
             "tools": result["tools_data"],
-            "events": result["events"]
-        }
+            "events": result["events"],
+            "etag": etag,
+            "cached": result["cached"]
+        }, headers=headers)
     else:
-        return {
+        return _upstream_error(result, "Errore nel recupero tools")
+
+@router.post("/tools/bulk")
+async def call_mcp_tools_bulk(
+    calls: list = Body(..., embed=True, description="Lista di chiamate: {name, arguments, id opzionale}"),
+    concurrency: int = Query(8, ge=1, le=64, description="Chiamate in parallelo per questa richiesta"),
+    timeout: float = Query(None, gt=0, le=300, description="Secondi massimi per ogni chiamata"),
+    ordered: bool = Query(False, description="Risultati nell'ordine delle chiamate invece che appena pronti")
+):
+    """Esegue molte chiamate a tool MCP in parallelo: un risultato per riga (NDJSON) appena disponibile"""
+    if not calls or len(calls) > BULK_MAX_CALLS:
+        return FastJSONResponse({
             "status": "error",
-            "message": result.get("message", "Errore nel recupero tools")
-        }
+            "message": f"Servono da 1 a {BULK_MAX_CALLS} chiamate"
+        }, status_code=400)
+
+    async def ndjson_stream():
+        started = time.perf_counter()
+        succeeded = 0
+        async for item in mcp_client.call_tools(calls, concurrency=concurrency, timeout=timeout, ordered=ordered):
+            succeeded += item["status"] == "success"
+            yield dumps(item) + b"\n"
+        yield dumps({"summary": {
+            "total": len(calls),
+            "successful": succeeded,
+            "failed": len(calls) - succeeded,
+            "wall_time_ms": round((time.perf_counter() - started) * 1000, 2)
+        }}) + b"\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+@router.post("/tools/{name}/call")
+async def call_mcp_tool(
+    name: str,
+    arguments: dict = Body(default={}, description="Argomenti del tool"),
+    deadline: float = Query(None, gt=0, le=300, description="Secondi massimi per la chiamata (default MCP_TOOL_CALL_DEADLINE)")
+):
+    """Invoca un tool MCP: progressi, contenuti e risultato arrivano in streaming (SSE)"""
+    async def event_stream():
+        async for event in mcp_client.call_tool(name, arguments, deadline=deadline):
+            yield b"event: " + event["event"].encode() + b"\ndata: " + dumps(event["data"]) + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/full-test")
 async def full_mcp_test():
     """Test completo del server MCP"""
+    started = time.perf_counter()
     result = await mcp_client.full_test()
+    wall_time_ms = round((time.perf_counter() - started) * 1000, 2)
     
     # Calcola statistiche
     total_tests = len(result)
@@ -75,7 +157,8 @@ async def full_mcp_test():
             "total_tests": total_tests,
             "successful_tests": successful_tests,
             "failed_tests": total_tests - successful_tests,
-            "success_rate": f"{(successful_tests/total_tests)*100:.1f}%"
+            "success_rate": f"{(successful_tests/total_tests)*100:.1f}%",
+            "wall_time_ms": wall_time_ms
         }
     }
 
@@ -88,10 +171,42 @@ async def mcp_health():
         return {
             "mcp_server": "healthy",
             "status_code": result["status_code"],
-            "note": result["note"]
+            "latency_ms": result["latency_ms"],
+            "note": result["note"],
+            "stats": result["stats"],
+            "circuit": mcp_client.circuit_snapshot()
         }
     else:
         return {
             "mcp_server": "unhealthy",
-            "error": result["error"]
+            "error": result["error"],
+            "stats": result["stats"],
+            "circuit": mcp_client.circuit_snapshot()
         }
+
+@router.get("/events")
+async def mcp_events(request: Request):
+    """Inoltra in SSE le notifiche push del server MCP (tools/list_changed, progress, log)"""
+    async def event_stream():
+        # Iscrizione solo quando lo stream parte: un client già disconnesso non lascia code orfane
+        queue = None
+        try:
+            queue = notification_listener.subscribe()
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield b"event: notification\ndata: " + dumps(item) + b"\n\n"
+        finally:
+            if queue is not None:
+                notification_listener.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/events/status")
+async def mcp_events_status():
+    """Stato degli stream di notifiche verso i server MCP"""
+    return notification_listener.snapshot()
@@ -0,0 +1,112 @@
+"""Registro delle route dell'app, costruito una volta da app.routes.
+
+Alimenta /docs-overview e /system/status: gli elenchi di endpoint non sono più scritti a mano
+e restano allineati alle route registrate. Le route sono raggruppate per tag;
+i payload derivati sono serializzati una volta per registro (StaticPayload).
+"""
+from fastapi.routing import APIRoute
+
+APP_GROUP = "app"
+APP_DESCRIPTION = "Endpoints principali dell'applicazione"
+
+
+def group_key(tag: str) -> str:
+    """Chiave breve del gruppo dal tag ("MCP Server" → "mcp", "Claude Test" → "claude")"""
+    return tag.split()[0].lower() if tag else APP_GROUP
+
+
+def _summary(route: APIRoute) -> str:
+    # Prima riga della docstring dell'endpoint
+    text = route.summary or route.description or ""
+    return text.strip().split("\n", 1)[0].strip()
+
+
+def _iter_routes(routes, prefix: str = "", tags: tuple = ()):
+    """Route API in ordine di registrazione, anche dentro i router inclusi"""
+    for route in routes:
+        router = getattr(route, "original_router", None)
+        if router is not None:
+            # FastAPI recenti: i router inclusi restano annidati
+            context = route.include_context
+            yield from _iter_routes(router.routes, prefix + (context.prefix or ""), tags + tuple(context.tags or ()))
+        elif isinstance(route, APIRoute):
+            yield prefix + route.path, route, list(tags) + list(route.tags or [])
+
+
+class RouteInfo:
+    """Endpoint registrato: metodi, path, gruppo e descrizione"""
+
+    __slots__ = ("methods", "path", "name", "tag", "group", "summary", "in_schema")
+
+    def __init__(self, path: str, route: APIRoute, tags: list):
+        self.methods = sorted(method for method in route.methods if method != "HEAD")
+        self.path = path
+        self.name = route.name
+        self.tag = tags[0] if tags else None
+        self.group = group_key(self.tag)
+        self.summary = _summary(route)
+        self.in_schema = route.include_in_schema
+
+    def labels(self):
+        return [f"{method} {self.path}" for method in self.methods]
+
+
+class RouteRegistry:
+    """Indice delle route di un'app, ricostruito solo con build()"""
+
+    def __init__(self):
+        self.app = None
+        self.routes = []
+        self.groups = {}     # "mcp" -> [RouteInfo]
+        self.descriptions = {}
+        self._payloads = {}
+
+    def build(self, app) -> "RouteRegistry":
+        self.app = app
+        self.routes = [RouteInfo(path, route, tags) for path, route, tags in _iter_routes(app.routes)]
+        # Il gruppo "app" (route senza tag) apre la panoramica
+        self.groups = {APP_GROUP: []}
+        for info in self.routes:
+            self.groups.setdefault(info.group, []).append(info)
+        # Descrizioni dei gruppi dai metadati openapi_tags dell'app
+        self.descriptions = {APP_GROUP: APP_DESCRIPTION}
+        for meta in app.openapi_tags or []:
+            self.descriptions[group_key(meta["name"])] = meta.get("description", "")
+        self._payloads = {}
+        return self
+
+    def for_app(self, app) -> "RouteRegistry":
+        """Registro dell'app (costruito al primo uso se il lifespan non l'ha già fatto)"""
+        if self.app is not app:
+            self.build(app)
+        return self
+
+    def overview(self) -> dict:
+        """Gruppi con descrizione e "METODO /path": descrizione dell'endpoint"""
+        overview = {}
+        for group, routes in self.groups.items():
+            endpoints = {}
+            for info in routes:
+                for label in info.labels():
+                    endpoints[label] = info.summary
+            if group == APP_GROUP and self.app.docs_url:
+                endpoints[f"GET {self.app.docs_url}"] = "Documentazione automatica Swagger"
+            overview[group] = {"description": self.descriptions.get(group, ""), "endpoints": endpoints}
+        return overview
+
+    def paths(self) -> dict:
+        """Path distinti per gruppo"""
+        return {
+            group: list(dict.fromkeys(info.path for info in routes))
+            for group, routes in self.groups.items()
+        }
+
+    def cached(self, name: str, factory):
+        """Payload derivato dal registro, calcolato una volta per build()"""
+        payload = self._payloads.get(name)
+        if payload is None:
+            payload = self._payloads[name] = factory(self)
+        return payload
+
+
+route_registry = RouteRegistry()
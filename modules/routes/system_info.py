@@ -1,38 +1,37 @@
-from fastapi import APIRouter
+import os
+import time
+from fastapi import APIRouter, Request
 from datetime import datetime
 from modules.test import esegui_test_completo
-from modules.mcp_client.mcp_client import mcp_client
+from modules.mcp_client.mcp_client import mcp_client, health_prober
+from modules.monitoring.startup import startup_report
+from modules.responses import FastJSONRoute, StaticPayload
+from modules.routes.registry import route_registry
 
-router = APIRouter(prefix="/system", tags=["System"])
+router = APIRouter(prefix="/system", tags=["System"], route_class=FastJSONRoute)
 
 @router.get("/health")
 async def health_check():
-    """Health check per entrambe le app"""
-    try:
-        # Test MCP Server
-        mcp_result = await mcp_client.test_connection()
-        mcp_status = "healthy" if mcp_result["status"] == "success" else "unhealthy"
-        
-        return {
-            "fastapi_app": "healthy",
-            "mcp_server": mcp_status,
-            "mcp_server_url": mcp_client.mcp_url,
-            "timestamp": datetime.now().isoformat()
-        }
-    except:
-        return {
-            "fastapi_app": "healthy", 
-            "mcp_server": "unreachable",
-            "mcp_server_url": mcp_client.mcp_url,
-            "timestamp": datetime.now().isoformat()
-        }
+    """Health check per entrambe le app (stato MCP dalla cache del probe in background).
+    Payload minimo: è la route interrogata da Fly e dai monitor; i contatori stanno in /debug/counters"""
+    mcp_health = await health_prober.get()
 
-@router.get("/status")
-async def overall_status():
-    """Status riepilogativo di tutto il sistema"""
     return {
+        "fastapi_app": "healthy",
+        "mcp_server": mcp_health["status"],
+        "mcp_server_url": mcp_client.mcp_url,
+        "mcp_checked_at": mcp_health["checked_at"],
+        "mcp_stale": mcp_health["stale"],
+        "mcp_circuit": mcp_client.circuit_snapshot(),
+        "worker_pid": os.getpid(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def _status_payload(registry) -> StaticPayload:
+    # Serializzato una volta per registro: per richiesta si inserisce solo il timestamp
+    return StaticPayload({
         "system": "test-mcp-production",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": None,
         "versions": {
             "v0": "FastAPI App - Metodi Locali",
             "v1": "MCP Server - Protocollo SSE"
@@ -41,26 +40,14 @@ async def overall_status():
             "v0_fastapi": "https://test-mcp-prodv0.fly.dev",
             "v1_mcp_server": mcp_client.mcp_url
         },
-        "endpoints": {
-            "system": [
-                "/system/health",
-                "/system/status", 
-                "/system/test-v0",
-                "/system/test-v1"
-            ],
-            "mcp": [
-                "/mcp/test",
-                "/mcp/tools",
-                "/mcp/full-test",
-                "/mcp/health"
-            ],
-            "app": [
-                "/",
-                "/welcome",
-                "/test"
-            ]
-        }
-    }
+        "endpoints": registry.paths()
+    }, max_age=0, timestamp=True)
+
+@router.get("/status")
+async def overall_status(request: Request):
+    """Status riepilogativo di tutto il sistema (supporta If-None-Match → 304)"""
+    payload = route_registry.for_app(request.app).cached("status", _status_payload)
+    return payload.response(request)
 
 @router.get("/test-v0")
 async def test_v0():
@@ -87,7 +74,9 @@ async def test_v0():
 @router.get("/test-v1")
 async def test_v1():
     """TEST V1: Testa il server MCP esterno"""
+    started = time.perf_counter()
     result = await mcp_client.full_test()
+    wall_time_ms = round((time.perf_counter() - started) * 1000, 2)
     
     # Calcola statistiche
     total_tests = len(result)
@@ -102,6 +91,12 @@ async def test_v1():
             "total_tests": total_tests,
             "successful_tests": successful_tests,
             "failed_tests": total_tests - successful_tests,
-            "success_rate": f"{(successful_tests/total_tests)*100:.1f}%"
+            "success_rate": f"{(successful_tests/total_tests)*100:.1f}%",
+            "wall_time_ms": wall_time_ms
         }
     }
+
+@router.get("/startup")
+async def startup_info():
+    """Tempi di avvio del worker (import, lifespan, pre-warm MCP, prima richiesta)"""
+    return startup_report.snapshot()
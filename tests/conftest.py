@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from modules.fake_mcp.server import FakeMCPConfig, create_app
+
+
+class FakeServer:
+    """Server MCP finto su uvicorn in un thread (connessioni TCP reali, porta libera)"""
+
+    def __init__(self, config: FakeMCPConfig):
+        self.app = create_app(config)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(5)
+
+    @property
+    def config(self) -> FakeMCPConfig:
+        return self.app.state.config
+
+    @property
+    def stats(self) -> dict:
+        return self.app.state.stats
+
+
+@pytest.fixture
+def fake_server():
+    """Factory: fake_server(tool_count=5, ...) avvia un server MCP finto, fermato a fine test"""
+    servers = []
+
+    def start(**options):
+        server = FakeServer(FakeMCPConfig(**options)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def run():
+    """Esegue una coroutine in un event loop nuovo"""
+    return asyncio.run
@@ -0,0 +1,98 @@
+import gzip
+import zlib
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from modules import compression
+from modules.compression import CompressionMiddleware, choose_encoding
+from modules.responses import StaticPayload
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "zstd"),
+    ("*, zstd;q=0", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding_honours_q_values(header, expected):
+    assert choose_encoding(header, ("zstd", "br", "gzip")) == expected
+
+
+async def _call(app, accept_encoding: str = "gzip") -> tuple:
+    """Esegue l'app ASGI e restituisce (messaggio start, chunk del body)"""
+    # ASGI 2.4: StreamingResponse non resta in ascolto della disconnessione del client
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "asgi": {"spec_version": "2.4"},
+        "headers": [(b"accept-encoding", accept_encoding.encode())]
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    await CompressionMiddleware(app, minimum_size=1000, encodings=("gzip",))(scope, receive, send)
+    return messages[0], [message.get("body", b"") for message in messages[1:]]
+
+
+def _headers(start: dict) -> dict:
+    return {key.decode(): value.decode() for key, value in start["headers"]}
+
+
+def test_complete_response_compressed_above_threshold(run):
+    body = b'{"text":"' + b"x" * 5000 + b'"}'
+    start, chunks = run(_call(Response(body, media_type="application/json", headers={"ETag": '"abc"'})))
+    headers = _headers(start)
+    assert headers["content-encoding"] == "gzip" and headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"abc"' and int(headers["content-length"]) == len(chunks[0]) < len(body)
+    assert gzip.decompress(chunks[0]) == body
+
+
+@pytest.mark.parametrize("response", [
+    Response(b"{}", media_type="application/json"),  # sotto la soglia
+    Response(b"x" * 5000, media_type="image/png"),  # tipo non comprimibile
+    Response(b"x" * 5000, media_type="application/json", headers={"Content-Encoding": "br"}),  # già codificata
+])
+def test_responses_left_unchanged(run, response):
+    start, chunks = run(_call(response))
+    assert _headers(start).get("content-encoding") in (None, "br")
+    assert b"".join(chunks) == response.body
+
+
+def test_identity_client_not_compressed(run):
+    body = b"x" * 5000
+    start, chunks = run(_call(Response(body, media_type="application/json"), accept_encoding="identity"))
+    assert "content-encoding" not in _headers(start) and chunks == [body]
+
+
+def test_stream_chunks_decodable_as_they_arrive(run):
+    events = [f"data: {i}\n\n".encode() for i in range(3)]
+
+    async def stream():
+        for event in events:
+            yield event
+
+    start, chunks = run(_call(StreamingResponse(stream(), media_type="text/event-stream")))
+    headers = _headers(start)
+    assert headers["content-encoding"] == "gzip" and "content-length" not in headers
+    # Ogni chunk compresso (flush di sincronizzazione) restituisce subito il suo evento
+    decoder = zlib.decompressobj(31)
+    assert [decoder.decompress(chunk) for chunk in chunks[:3]] == events
+    assert decoder.decompress(chunks[3]) + decoder.flush() == b""
+
+
+def test_static_payload_compressed_variant_cached():
+    payload = StaticPayload({"text": "x" * 5000})
+    before = compression.stats["static_variants"]
+    responses = [payload.response(Request({"type": "http", "headers": [(b"accept-encoding", b"gzip")]})) for _ in range(3)]
+    assert compression.stats["static_variants"] == before + 1
+    assert all(response.headers["content-encoding"] == "gzip" for response in responses)
+    assert responses[0].headers["etag"] == "W/" + payload.etag and responses[0].headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(responses[0].body) == payload.body()
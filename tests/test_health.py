@@ -0,0 +1,55 @@
+import asyncio
+
+from modules.mcp_client.health import HealthProber
+
+
+class Client:
+    """test_connection finto: conta i probe e ne controlla durata ed esito"""
+
+    def __init__(self):
+        self.calls = 0
+        self.delay = 0.0
+        self.status = "success"
+
+    async def test_connection(self) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.status == "raise":
+            raise ConnectionError("down")
+        return {"status": self.status}
+
+
+def test_first_get_waits_for_one_shared_probe(run):
+    client = Client()
+    client.delay = 0.02
+
+    async def scenario():
+        prober = HealthProber(client, interval=10)
+        return await asyncio.gather(*(prober.get() for _ in range(10)))
+
+    results = run(scenario())
+    assert client.calls == 1
+    assert all(result["status"] == "healthy" and not result["stale"] for result in results)
+
+
+def test_stale_result_served_while_revalidating(run):
+    client = Client()
+
+    async def scenario():
+        prober = HealthProber(client, interval=10, max_age=0.01)
+        await prober.get()
+        await asyncio.sleep(0.02)
+
+        # Probe lento e server giù: la risposta non aspetta, arriva il risultato vecchio marcato stale
+        client.delay, client.status = 0.2, "raise"
+        stale = await asyncio.wait_for(prober.get(), 0.05)
+        again = await prober.get()  # stesso probe in corso, nessun altro avviato
+        await prober.refresh()
+        fresh = prober.snapshot()
+        await prober.stop()
+        return stale, again, fresh
+
+    stale, again, fresh = run(scenario())
+    assert stale["status"] == "healthy" and stale["stale"] is True
+    assert again["status"] == "healthy" and client.calls == 2
+    assert fresh["status"] == "unreachable" and fresh["detail"]["error"] == "down"
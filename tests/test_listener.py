@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import httpx
+
+from modules.mcp_client.listener import NotificationListener
+from modules.mcp_client.mcp_client import MCPClient, notification_listener
+from modules.mcp_client.transport import MCPTransport
+from modules.routes.mcp import mcp_events
+
+LIST_CHANGED = {"jsonrpc": "2.0", "method": "notifications/tools/list_changed"}
+
+
+def _handler(streams: list):
+    """POST: initialize in JSON semplice; GET: uno stream della lista per connessione"""
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            body = json.loads(request.content)
+            result = {"protocolVersion": "2024-11-05", "sessionId": "s1"}
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": result})
+        body = streams.pop(0) if streams else b""
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+    return handle
+
+
+def test_reconnect_discards_partial_event(run):
+    streams = [
+        # Stream interrotto a metà evento: id completato, data senza riga vuota finale
+        b"id: 7\nevent: message\ndata: {\"jsonrpc\": \"2.0\", \"method\": \"notifications/progr",
+        b"id: 8\nevent: message\ndata: " + json.dumps(LIST_CHANGED).encode() + b"\n\n",
+    ]
+    requests = []
+
+    async def scenario():
+        transport = MCPTransport(http_transport=httpx.MockTransport(_handler(streams)))
+        client = MCPClient("http://mcp.test", transport=transport)
+        listener = NotificationListener(client, min_backoff=0.01, max_backoff=0.01)
+        queue = listener.subscribe(["notifications/tools/list_changed"])
+        listener.start()
+        try:
+            item = await asyncio.wait_for(queue.get(), 2)
+        finally:
+            await listener.stop()
+            await client.aclose()
+        requests.append(listener.state["http://mcp.test"])
+        return item
+
+    item = run(scenario())
+    assert item["message"] == LIST_CHANGED
+    assert requests[0]["last_event_id"] == "8"
+
+
+def test_events_route_subscribes_only_while_streaming(run):
+    class Request:
+        async def is_disconnected(self):
+            return False
+
+    async def scenario():
+        before = len(notification_listener._subscribers)
+        # Client disconnesso prima dell'avvio dello stream: nessuna coda registrata
+        await mcp_events(Request())
+        assert len(notification_listener._subscribers) == before
+
+        stream = (await mcp_events(Request())).body_iterator
+        assert await stream.__anext__() == ": connected\n\n"
+        notification_listener.publish("http://mcp.test", LIST_CHANGED)
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk, len(notification_listener._subscribers) - before
+
+    chunk, leaked = run(scenario())
+    assert chunk.startswith(b"event: notification\ndata: {") and leaked == 0
+    assert json.loads(chunk.split(b"data: ", 1)[1])["message"] == LIST_CHANGED
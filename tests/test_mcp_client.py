@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+
+from modules.mcp_client.mcp_client import MCPClient
+
+
+def _connections(server) -> int:
+    return httpx.get(f"{server.url}/_stats").json()["connections"]
+
+
+def test_keepalive_connection_reused(fake_server, run):
+    server = fake_server(progress_events=2)
+
+    async def scenario():
+        client = MCPClient(server.url)
+        try:
+            for _ in range(20):
+                result = await client.list_tools(use_cache=False)
+                assert result["status"] == "success"
+            events = [event async for event in client.call_tool("tool_0", {"text": "a"})]
+            assert events[-1]["event"] == "result"
+            # Il resto del body delle risposte anticipate si legge in background
+            await asyncio.sleep(0.2)
+        finally:
+            await client.aclose()
+
+    run(scenario())
+    assert server.stats["tools/list"] == 20
+    assert _connections(server) == 1
+
+
+def test_pooled_session_verified_before_online(fake_server, run):
+    server = fake_server()
+
+    async def scenario():
+        client = MCPClient(server.url)
+        try:
+            first = await client.initialize_mcp()
+            assert first["status"] == "success" and first["verified_with"] == "initialize"
+            warm = await client.initialize_mcp()
+            assert warm["session_reused"] and warm["verified_with"] == "ping"
+
+            # Server giù: la sessione in pool non basta per dichiararlo online
+            server.config.error_rate = 1.0
+            for _ in range(12):
+                down = await client.initialize_mcp()
+                assert down["status"] == "error"
+            assert client.breaker().state == "open"
+            assert (await client.initialize_mcp())["circuit"] == "open"
+            assert (await client.full_test())["initialize"]["status"] == "error"
+        finally:
+            await client.aclose()
+
+    run(scenario())
+    assert server.stats["ping"] >= 1
+
+
+def test_batch_and_fallback(fake_server, run):
+    server = fake_server()
+    no_batch = fake_server(batch=False)
+
+    async def scenario(url):
+        client = MCPClient(url)
+        try:
+            assert not client.batcher.enabled  # auto-batching opt-in
+            responses = await client.batch([("ping", None), ("tools/list", None)])
+            return [response.kind for response in responses], client.batch_unsupported
+        finally:
+            await client.aclose()
+
+    assert run(scenario(server.url)) == (["result", "result"], set())
+    assert server.stats["batches"] == 1
+    kinds, unsupported = run(scenario(no_batch.url))
+    assert kinds == ["result", "result"] and unsupported == {no_batch.url}
@@ -0,0 +1,64 @@
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from modules.monitoring.metrics import ARCHIVE, MetricsMiddleware, MetricsRegistry, archive_worker
+
+
+def _worker(path: str, requests: int, in_flight: int = 0) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    route = registry.route("GET", "/x")
+    for _ in range(requests):
+        route.latency.observe(0.01)
+        route.statuses[200] = route.statuses.get(200, 0) + 1
+    registry.observe_upstream("tools/list", 0.02, ok=False)
+    registry.in_flight = in_flight
+    with open(path, "w") as file:
+        json.dump(registry.state(), file)
+    return registry
+
+
+def _value(text: str, series: str) -> float:
+    return float(next(line for line in text.splitlines() if line.startswith(series + " ")).rsplit(" ", 1)[1])
+
+
+def test_middleware_counts_by_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    with TestClient(app) as client:
+        for i in range(3):
+            client.get(f"/items/{i}")
+        client.get("/missing")
+    text = registry.render()
+    assert _value(text, 'http_requests_total{method="GET",route="/items/{item_id}",status="200"}') == 3
+    assert _value(text, 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"}') == 3
+    assert _value(text, 'http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    assert registry.in_flight == 0
+
+
+def test_workers_aggregated_and_monotonic(tmp_path):
+    directory = str(tmp_path)
+    _worker(os.path.join(directory, "101.json"), requests=3, in_flight=2)
+    _worker(os.path.join(directory, "102.json"), requests=5, in_flight=1)
+    reader = MetricsRegistry(directory)
+    series = 'http_requests_total{method="GET",route="/x",status="200"}'
+
+    first = reader.collect().render()
+    assert _value(first, series) == 8 and _value(first, "http_requests_in_flight") == 3
+    assert _value(first, 'mcp_upstream_errors_total{method="tools/list"}') == 2
+
+    # Worker 101 riciclato: i suoi contatori restano nel totale, il gauge no
+    archive_worker(directory, 101)
+    assert not os.path.exists(os.path.join(directory, "101.json"))
+    assert json.load(open(os.path.join(directory, ARCHIVE)))["pids"] == [101]
+    second = reader.collect().render()
+    assert _value(second, series) == 8 and _value(second, "http_requests_in_flight") == 1
+    assert _value(second, 'http_request_duration_seconds_count{method="GET",route="/x"}') == 8
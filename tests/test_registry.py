@@ -0,0 +1,67 @@
+from fastapi import APIRouter, FastAPI
+
+from main import app as main_app
+from modules.routes.registry import APP_DESCRIPTION, RouteRegistry
+
+
+def _app() -> FastAPI:
+    app = FastAPI(openapi_tags=[{"name": "Tools Api", "description": "Gestione tools"}])
+    router = APIRouter(prefix="/tools", tags=["Tools Api"])
+
+    @router.get("/list")
+    async def list_tools():
+        """Elenco dei tools
+
+        Dettagli che non finiscono nella panoramica"""
+
+    @router.api_route("/{name}", methods=["GET", "POST"])
+    async def tool(name: str):
+        """Singolo tool"""
+
+    @app.get("/ping")
+    async def ping():
+        """Ping"""
+
+    app.include_router(router, prefix="/v1")
+    return app
+
+
+def test_overview_generated_from_routes():
+    app = _app()
+    registry = RouteRegistry().build(app)
+    overview = registry.overview()
+    assert list(overview) == ["app", "tools"]
+    assert overview["app"] == {
+        "description": APP_DESCRIPTION,
+        "endpoints": {"GET /ping": "Ping", "GET /docs": "Documentazione automatica Swagger"}
+    }
+    # Router incluso: prefissi concatenati, descrizione del gruppo da openapi_tags, prima riga della docstring
+    assert overview["tools"] == {
+        "description": "Gestione tools",
+        "endpoints": {
+            "GET /v1/tools/list": "Elenco dei tools",
+            "GET /v1/tools/{name}": "Singolo tool",
+            "POST /v1/tools/{name}": "Singolo tool"
+        }
+    }
+    assert registry.paths() == {"app": ["/ping"], "tools": ["/v1/tools/list", "/v1/tools/{name}"]}
+
+
+def test_payloads_cached_per_build():
+    app = _app()
+    registry = RouteRegistry().for_app(app)
+    calls = []
+    first = registry.cached("overview", lambda r: calls.append(1) or r.overview())
+    assert registry.cached("overview", lambda r: calls.append(1) or r.overview()) is first
+    assert registry.for_app(app) is registry and len(calls) == 1
+    # Altra app (o nuovo build): payload ricalcolati
+    registry.for_app(_app())
+    registry.cached("overview", lambda r: calls.append(1) or r.overview())
+    assert len(calls) == 2
+
+
+def test_main_app_routes_listed():
+    overview = RouteRegistry().build(main_app).overview()
+    assert "GET /mcp/tools" in overview["mcp"]["endpoints"]
+    assert "GET /test/test-claude" in overview["claude"]["endpoints"]
+    assert overview["system"]["description"] == "Endpoints di sistema e monitoraggio"
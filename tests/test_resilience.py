@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import httpx
+
+from modules.mcp_client.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from modules.mcp_client.mcp_client import MCPClient
+from modules.mcp_client.singleflight import SingleFlight
+
+
+def test_breaker_opens_and_recovers_through_half_open():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4, open_seconds=0.05)
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # un solo probe in half-open
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_failure_reopens():
+    breaker = CircuitBreaker(min_calls=1, open_seconds=0.01)
+    breaker.allow()
+    breaker.record(False)
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.retry_after() > 0
+
+
+def test_singleflight_shares_one_execution(run):
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(20)))
+        return results, flight.snapshot()
+
+    results, snapshot = run(scenario())
+    assert results == ["ok"] * 20 and len(calls) == 1
+    assert snapshot == {"inflight": 0, "leaders": 1, "shared": 19}
+
+
+def test_concurrent_initialize_coalesced(fake_server, run):
+    server = fake_server(latency_ms=20)
+
+    async def scenario():
+        client = MCPClient(server.url)
+        try:
+            results = await asyncio.gather(*(client.initialize_mcp() for _ in range(30)))
+        finally:
+            await client.aclose()
+        return results
+
+    assert all(result["status"] == "success" for result in run(scenario()))
+    assert server.stats["initialize"] == 1
+
+
+def test_session_reinitialized_when_server_forgets_it(fake_server, run):
+    server = fake_server(require_session=True)
+
+    async def scenario():
+        client = MCPClient(server.url)
+        try:
+            assert (await client.list_tools(use_cache=False))["status"] == "success"
+            # Sessione scaduta lato server: la chiamata successiva deve re-inizializzare da sola
+            session = client.sessions._idle[server.url][0]
+            async with httpx.AsyncClient() as http:
+                await http.delete(f"{server.url}/mcp", headers=session.headers())
+            result = await client.list_tools(use_cache=False)
+            events = [event async for event in client.call_tool("tool_0", {"text": "a"})]
+        finally:
+            await client.aclose()
+        return result, events
+
+    result, events = run(scenario())
+    assert result["status"] == "success"
+    assert events[-1]["event"] == "result"
+    assert server.stats["initialize"] == 2
+
+
+def test_discarded_sessions_closed_on_server(fake_server, run):
+    server = fake_server()
+
+    def open_sessions() -> int:
+        return httpx.get(f"{server.url}/_stats").json()["sessions"]
+
+    async def scenario():
+        client = MCPClient(server.url)
+        client.sessions.max_idle = 1
+        try:
+            # Sessioni fresche oltre la capienza del pool (come full_test): chiuse con DELETE
+            for _ in range(3):
+                assert (await client.initialize_mcp(fresh=True))["status"] == "success"
+            await asyncio.sleep(0.1)
+            overflow = open_sessions()
+            # Sessione scaduta al momento dell'acquire: chiusa anche lei
+            client.sessions.idle_timeout = 0
+            await client.initialize_mcp()
+            await asyncio.sleep(0.1)
+            expired = open_sessions()
+        finally:
+            await client.aclose()
+        return overflow, expired
+
+    assert run(scenario()) == (1, 1)
+    # Shutdown: anche la sessione rimasta in pool viene chiusa
+    assert open_sessions() == 0
+    assert server.stats["initialize"] == 4
+
+
+def test_adaptive_timeout_follows_latency_step(fake_server, run):
+    server = fake_server(latency_ms=5)
+
+    async def scenario():
+        client = MCPClient(server.url)
+        client.timeout_min = 0.05
+        client.timeout_multiplier = 2
+        target = f"{server.url}/mcp"
+        try:
+            for i in range(60):
+                await client._rpc({"jsonrpc": "2.0", "id": i, "method": "ping"})
+            assert client.call_timeout(target) < 0.1
+
+            # Server stabilmente più lento (300 ms), sempre entro il read timeout
+            server.config.latency_ms = 300
+            outcomes = []
+            for i in range(10):
+                try:
+                    await client._rpc({"jsonrpc": "2.0", "id": 100 + i, "method": "ping"})
+                    outcomes.append(True)
+                except httpx.TimeoutException:
+                    outcomes.append(False)
+            return outcomes, client.call_timeout(target), client.breaker().state
+        finally:
+            await client.aclose()
+
+    outcomes, timeout, state = run(scenario())
+    # Timeout censurati e backoff: dopo pochi timeout le chiamate tornano a riuscire
+    assert outcomes[0] is False and all(outcomes[-5:])
+    assert timeout > 0.3 and state == CLOSED
@@ -0,0 +1,95 @@
+import json
+
+import fastapi.routing
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from starlette.requests import Request
+
+from modules.responses import FastJSONResponse, FastJSONRoute, RawJSON, StaticPayload, dumps, raw_object
+
+
+class Item(BaseModel):
+    name: str
+
+
+def _app() -> TestClient:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.router.route_class = FastJSONRoute
+
+    @app.get("/plain")
+    async def plain():
+        return {"b": 1, "a": [1.5, None, "è"]}
+
+    @app.get("/model", response_model=Item)
+    async def model():
+        return {"name": "x", "secret": "filtered"}
+
+    @app.get("/with-response")
+    def with_response(response: Response):
+        response.headers["X-Extra"] = "1"
+        return {"ok": True}
+
+    @app.get("/not-native")
+    async def not_native():
+        return {"items": {3}, "model": Item(name="y")}
+
+    return TestClient(app)
+
+
+def test_fast_route_serializes_directly(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("jsonable_encoder non deve essere usato")
+
+    # Percorso veloce: il dict restituito non passa da jsonable_encoder
+    monkeypatch.setattr(fastapi.routing, "jsonable_encoder", fail)
+    client = _app()
+    response = client.get("/plain")
+    # Byte compatti, ordine delle chiavi e unicode preservati
+    assert response.content == '{"b":1,"a":[1.5,null,"è"]}'.encode()
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_fast_route_keeps_fastapi_semantics():
+    client = _app()
+    # response_model e parametro Response: la route passa ancora da FastAPI
+    assert client.get("/model").json() == {"name": "x"}
+    response = client.get("/with-response")
+    assert response.headers["x-extra"] == "1" and response.json() == {"ok": True}
+    # Tipi non nativi: fallback su jsonable_encoder
+    assert client.get("/not-native").json() == {"items": [3], "model": {"name": "y"}}
+
+
+def test_raw_object_splices_encoded_fragments():
+    body = raw_object({"status": "success", "tools": RawJSON(b'{"tools": [1, 2]}'), "n": 1})
+    assert body == b'{"status":"success","tools":{"tools": [1, 2]},"n":1}'
+    assert json.loads(body)["tools"] == {"tools": [1, 2]}
+    assert dumps({1: "a"}) == b'{"1":"a"}'
+
+
+def _request(**headers) -> Request:
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_static_payload_encoded_once_with_etag():
+    payload = StaticPayload({"message": "ciao", "n": 1}, max_age=300)
+    response = payload.response(_request())
+    assert response.body == b'{"message":"ciao","n":1}'
+    assert response.headers["cache-control"] == "public, max-age=300"
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/") and StaticPayload({"message": "ciao", "n": 1}).etag == etag
+
+    not_modified = payload.response(_request(if_none_match=etag))
+    assert not_modified.status_code == 304 and not_modified.body == b""
+
+
+def test_static_payload_timestamp_spliced_in_place():
+    payload = StaticPayload({"system": "x", "timestamp": None, "n": 1}, max_age=0, timestamp=True)
+    first, second = json.loads(payload.body()), json.loads(payload.body())
+    # Il timestamp cambia per richiesta ma resta nella sua posizione; ETag debole e costante
+    assert list(first) == ["system", "timestamp", "n"] and first["n"] == 1
+    assert first["timestamp"] <= second["timestamp"]
+    response = payload.response(_request())
+    assert response.headers["etag"].startswith("W/") and response.headers["cache-control"] == "no-cache"
+    assert payload.response(_request(if_none_match=payload.etag)).status_code == 304
+
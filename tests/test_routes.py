@@ -0,0 +1,91 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from modules.mcp_client.mcp_client import mcp_client
+from modules.mcp_client.transport import MCPTransport
+
+
+@pytest.fixture
+def api(fake_server, monkeypatch):
+    """App reale con il client MCP globale puntato a un server finto (pool e breaker nuovi)"""
+    server = fake_server(tool_count=4)
+    # Niente attività in background dal lifespan: i contatori del test restano deterministici
+    monkeypatch.setenv("MCP_PREWARM", "0")
+    monkeypatch.setenv("MCP_NOTIFICATIONS", "0")
+    monkeypatch.setattr(mcp_client, "mcp_url", server.url)
+    monkeypatch.setattr(mcp_client, "transport", MCPTransport())
+    monkeypatch.setattr(mcp_client, "breakers", {})
+    mcp_client.sessions.clear()
+    mcp_client.tool_cache.invalidate(server.url)
+    with TestClient(app) as client:
+        yield client, server
+    mcp_client.sessions.clear()
+
+
+def test_tools_circuit_open_returns_retry_after(api):
+    client, server = api
+    server.config.error_rate = 1.0
+    for _ in range(12):
+        response = client.get("/mcp/tools", params={"refresh": True})
+        assert response.json()["status"] == "error"
+    assert response.status_code == 503
+    body = response.json()
+    assert body["circuit"] == "open" and body["retry_after_s"] > 0 and body["error"]
+    assert int(response.headers["retry-after"]) >= 1
+    assert client.get("/mcp/test").json()["circuit"] == "open"
+
+
+def test_health_stays_small(api):
+    client, _ = api
+    response = client.get("/system/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) < 1000
+    assert "mcp_coalescing" not in response.json()
+    assert set(client.get("/debug/counters").json()) >= {"mcp_coalescing", "mcp_batching", "compression"}
+
+
+def test_tools_etag_and_304(api):
+    client, server = api
+    first = client.get("/mcp/tools", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/")
+    assert first.json()["cached"] is False and len(first.json()["tools"]["result"]["tools"]) == 4
+
+    second = client.get("/mcp/tools", headers={"Accept-Encoding": "gzip"})
+    # Variante compressa: stesso ETag, reso debole
+    assert second.json()["cached"] is True and second.headers["etag"] == f"W/{etag}"
+    assert client.get("/mcp/tools", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/mcp/tools", headers={"If-None-Match": f'W/{etag}, "x"'}).status_code == 304
+    assert client.get("/mcp/tools", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert server.stats["tools/list"] == 1
+
+
+def test_tools_etag_independent_of_writer(api, monkeypatch):
+    client, _ = api
+    headers = {"Accept-Encoding": "identity"}
+    passthrough = client.get("/mcp/tools", params={"refresh": True}, headers=headers)
+    # Stesso catalogo riempito dal percorso decodificato: l'ETag non cambia
+    monkeypatch.setattr(mcp_client, "passthrough", False)
+    decoded = client.get("/mcp/tools", params={"refresh": True}, headers=headers)
+    assert passthrough.headers["etag"] == decoded.headers["etag"]
+    assert passthrough.json()["tools"]["result"] == decoded.json()["tools"]["result"]
+
+
+def test_static_payload_etag(api):
+    client, _ = api
+    for path in ("/welcome", "/docs-overview", "/system/status"):
+        response = client.get(path)
+        assert client.get(path, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_claude_diagnostic_leaves_catalog_cache(api):
+    client, server = api
+    etag = client.get("/mcp/tools").headers["etag"]
+    for _ in range(2):
+        report = client.get("/test/test-claude").json()
+        assert report["tests"]["tools_list"]["tools_count"] == 4
+    # La diagnostica interroga sempre il server e non riscrive la voce di /mcp
+    assert server.stats["tools/list"] == 3
+    cached = client.get("/mcp/tools")
+    assert cached.json()["cached"] is True and cached.headers["etag"] == etag
@@ -0,0 +1,108 @@
+import json
+import time
+
+import httpx
+import pytest
+
+from modules.mcp_client.mcp_client import MCPClient
+from modules.mcp_client.sse import SSEDecoder, SSEEvent, match_rpc_id, rpc_kind
+from modules.mcp_client.transport import MCPTransport
+from modules.responses import dumps
+
+
+@pytest.mark.parametrize("data, request_id, expected", [
+    ('{"jsonrpc":"2.0","id":1,"result":{"tools":[]}}', 1, True),
+    ('{"jsonrpc": "2.0", "id": 1, "error": {"code": -1}}', 1, True),
+    ('{"jsonrpc":"2.0","result":{"x":1},"id":1}', 1, True),
+    ('{"jsonrpc":"2.0","id":"a\\"b","result":1}', 'a"b', True),
+    ('{"jsonrpc":"2.0","id":2,"result":{}}', 1, False),
+    # Notifiche e richieste del server non sono risposte, anche con id/result annidati
+    ('{"jsonrpc":"2.0","method":"x","params":{"id":1,"result":2}}', 1, False),
+    ('{"jsonrpc":"2.0","method":"notifications/message","params":{"level":"error","id":1}}', 1, False),
+    ('{"jsonrpc":"2.0","id":1,"method":"sampling/createMessage","params":{}}', 1, False),
+])
+def test_match_rpc_id(data, request_id, expected):
+    assert match_rpc_id(data, request_id) is expected
+
+
+def test_rpc_kind_ignores_string_values():
+    assert rpc_kind('{"jsonrpc":"2.0","id":1,"result":{"level":"error"}}') == "result"
+    assert rpc_kind('{"jsonrpc":"2.0","method":"log","params":{"level":"error"}}') is None
+
+
+def test_decoder_chunk_boundaries():
+    stream = b'id: 1\r\nevent: message\r\ndata: {"a":\r\ndata: 1}\r\n\r\n: ping\n\nretry: 500\ndata: x\n\n'
+    decoder = SSEDecoder()
+    events = []
+    for i in range(len(stream)):
+        events.extend(decoder.feed(stream[i:i + 1]))
+    events.extend(decoder.flush())
+    assert [(e.event, e.data, e.id) for e in events] == [("message", '{"a":\n1}', "1"), (None, "x", None)]
+    assert decoder.last_event_id == "1" and decoder.retry == 500
+
+
+def test_server_request_with_same_id_not_cached_as_catalog(run):
+    tools = {"tools": [{"name": "echo"}]}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if body["method"] == "initialize":
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": {"sessionId": "s"}})
+        decoy = {"jsonrpc": "2.0", "id": body["id"], "method": "roots/list", "params": {"id": body["id"], "result": 1}}
+        reply = {"jsonrpc": "2.0", "id": body["id"], "result": tools}
+        stream = "".join(f"event: message\ndata: {json.dumps(m)}\n\n" for m in (decoy, reply))
+        return httpx.Response(200, content=stream.encode(), headers={"content-type": "text/event-stream"})
+
+    async def scenario():
+        client = MCPClient("http://mcp.test", transport=MCPTransport(http_transport=httpx.MockTransport(handle)))
+        try:
+            return await client.list_tools(use_cache=False)
+        finally:
+            await client.aclose()
+
+    result = run(scenario())
+    assert result["status"] == "success"
+    assert result["tools_data"]["result"] == tools
+
+
+def test_to_raw_validates_data():
+    assert json.loads(SSEEvent(data='{"a":\n1}').to_raw()) == {"data": {"a": 1}}
+    assert json.loads(SSEEvent(data='{"a":').to_raw()) == {"data": '{"a":'}
+    assert json.loads(SSEEvent(data="[1,\n]").to_raw()) == {"data": "[1,\n]"}
+
+
+def test_malformed_catalog_not_forwarded(run):
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if body["method"] == "initialize":
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": {"sessionId": "s"}})
+        stream = f'event: message\ndata: {{"jsonrpc":"2.0","id":{body["id"]},"result":{{"tools":[1,}}}}\n\n'
+        return httpx.Response(200, content=stream.encode(), headers={"content-type": "text/event-stream"})
+
+    async def scenario():
+        client = MCPClient("http://mcp.test", transport=MCPTransport(http_transport=httpx.MockTransport(handle)))
+        try:
+            result = await client.list_tools(use_cache=False, encoder=dumps)
+            return result, client.tool_cache.get(client.mcp_url, client.protocol_version)
+        finally:
+            await client.aclose()
+
+    result, cached = run(scenario())
+    # Byte non validi: niente cache né inoltro diretto, risposta comunque JSON valido
+    assert result["status"] == "success" and result["tools_data"] is None and result["etag"] is None
+    assert cached is None
+    assert json.loads(dumps(result))["events"][0]["data"].startswith("{")
+
+
+def test_decoder_long_line_linear():
+    # Riga data: da 4 MB in chunk da 4 KB: prima ogni chunk ripassava tutto il buffer (16 s)
+    payload = b'{"result":"' + b"x" * (4 * 1024 * 1024) + b'"}'
+    stream = b"data: " + payload + b"\r\n\r\n"
+    decoder = SSEDecoder()
+    events = []
+    started = time.perf_counter()
+    for i in range(0, len(stream), 4096):
+        events.extend(decoder.feed(stream[i:i + 4096]))
+    elapsed = time.perf_counter() - started
+    assert [event.data.encode() for event in events] == [payload]
+    assert elapsed < 0.5
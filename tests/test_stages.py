@@ -0,0 +1,48 @@
+import asyncio
+
+from modules.mcp_client.stages import run_stage_graph
+
+
+def _stage(log: list, name: str, delay: float, status: str = "success"):
+    async def stage():
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return {"status": status}
+    return stage
+
+
+def test_independent_stages_run_in_parallel(run):
+    log = []
+    results = run(run_stage_graph({
+        "connection": (_stage(log, "connection", 0.1), []),
+        "initialize": (_stage(log, "initialize", 0.1), []),
+        "tools_list": (_stage(log, "tools_list", 0.05), ["initialize"]),
+    }, deadline=5))
+
+    # I due stage indipendenti partono insieme; tools_list solo dopo initialize
+    assert log[:2] == [("start", "connection"), ("start", "initialize")]
+    assert log.index(("start", "tools_list")) > log.index(("end", "initialize"))
+    assert results["tools_list"]["timing"]["start_ms"] >= results["initialize"]["timing"]["end_ms"]
+    total = max(result["timing"]["end_ms"] for result in results.values())
+    assert total < 250  # in serie sarebbero 250 ms
+
+
+def test_failed_dependency_skips_stage(run):
+    log = []
+    results = run(run_stage_graph({
+        "initialize": (_stage(log, "initialize", 0, status="error"), []),
+        "tools_list": (_stage(log, "tools_list", 0), ["initialize"]),
+    }, deadline=5))
+    assert set(results) == {"initialize"} and ("start", "tools_list") not in log
+
+
+def test_shared_deadline(run):
+    log = []
+    results = run(run_stage_graph({
+        "fast": (_stage(log, "fast", 0.01), []),
+        "slow": (_stage(log, "slow", 5), []),
+    }, deadline=0.1))
+    assert results["fast"]["status"] == "success"
+    assert results["slow"]["status"] == "error" and "Deadline" in results["slow"]["error"]
+    assert results["slow"]["timing"]["end_ms"] < 500
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from modules.monitoring.watchdog import LoopWatchdog, WatchdogMiddleware
+
+
+def test_blocking_call_captured_with_route_and_stack(run):
+    loop_watchdog = LoopWatchdog(threshold_ms=50)
+
+    async def blocking_app(scope, receive, send):
+        time.sleep(0.3)  # blocca l'event loop
+
+    async def scenario():
+        loop_watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+            app = WatchdogMiddleware(blocking_app, loop_watchdog)
+            await app({"type": "http", "method": "GET", "path": "/slow"}, None, None)
+            await asyncio.sleep(0.1)
+        finally:
+            await loop_watchdog.stop()
+        return loop_watchdog.snapshot()
+
+    snapshot = run(scenario())
+    assert not snapshot["enabled"] and len(snapshot["stalls"]) == 1
+    stall = snapshot["stalls"][0]
+    assert stall["route"] == "GET /slow" and stall["duration_ms"] >= 200
+    assert any("in blocking_app" in line for line in stall["stack"])
+    assert "_beat" not in stall and loop_watchdog.active == {}
+
+
+def test_idle_loop_has_no_stalls(run):
+    loop_watchdog = LoopWatchdog(threshold_ms=50)
+
+    async def scenario():
+        loop_watchdog.start()
+        await asyncio.sleep(0.3)
+        await loop_watchdog.stop()
+
+    run(scenario())
+    assert loop_watchdog.snapshot()["stalls"] == []